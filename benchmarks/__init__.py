@@ -0,0 +1,5 @@
+"""
+Package initializer.
+
+Benchmark suite for the networking package and calculators. Run with: python -m benchmarks.run
+"""
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+run.py
+
+Measures throughput and peak memory of the networking package and the unused subnet calculator
+on seeded, synthetic networks, and writes the results as JSON so runs can be compared.
+
+Usage (from the repository root):
+    python -m benchmarks.run --sizes 1000 100000 1000000 --output results.json
+    python -m benchmarks.run --sizes 1000 --compare results.json
+"""
+
+import io
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+
+from networking import IP, IPRange, CIDR
+import unused_subnet_calculator
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+# slowdowns above this ratio are flagged by --compare
+REGRESSION_THRESHOLD = 1.10
+
+
+class Workload:
+    """Seeded synthetic network: a network CIDR and `size` non-overlapping allocated subnets."""
+    # each allocation gets its own aligned slot of 2**SLOT_BITS addresses
+    SLOT_BITS = 6
+    BASE = 64 << 24 # 64.0.0.0, aligned for networks up to a /2
+
+    def __init__(self, size, seed):
+        rng = random.Random(seed)
+        self.size = size
+        slot_bits = Workload.SLOT_BITS
+        host_bits = max(size - 1, 1).bit_length() + slot_bits
+        self.network = f"{IP._new(Workload.BASE)}/{CIDR.MAX_MASK - host_bits}"
+        # allocations: a random block inside each of `size` random slots
+        slots = rng.sample(range(1 << (host_bits - slot_bits)), size)
+        self.allocated = []
+        for slot in slots:
+            mask = rng.randint(CIDR.MAX_MASK - slot_bits, CIDR.MAX_MASK)
+            block_bits = CIDR.MAX_MASK - mask
+            offset = rng.randrange(1 << (slot_bits - block_bits)) << block_bits
+            self.allocated.append(f"{IP._new(Workload.BASE + (slot << slot_bits) + offset)}/{mask}")
+        self.ips = [cidr_string.split("/")[0] for cidr_string in self.allocated]
+        # arbitrary (unaligned) ranges for from_ip_range
+        self.ranges = []
+        for _ in range(size):
+            first = rng.randrange(Workload.BASE, Workload.BASE + (1 << host_bits))
+            last = min(first + rng.randrange(1 << 16), IP.MAX_NUM)
+            self.ranges.append((first, last))
+        return
+
+
+def bench_ip_parse(workload):
+    """IP(ip_string=...)"""
+    for ip_string in workload.ips:
+        IP(ip_string=ip_string)
+    return len(workload.ips)
+
+
+def bench_ip_compare(workload):
+    """Sorting IPs (n log n comparisons)."""
+    ips = [IP(ip_string=ip_string) for ip_string in workload.ips]
+    start = time.perf_counter()
+    sorted(ips)
+    return len(ips), time.perf_counter() - start
+
+
+def bench_cidr_parse(workload):
+    """CIDR(cidr_string=...)"""
+    for cidr_string in workload.allocated:
+        CIDR(cidr_string=cidr_string)
+    return len(workload.allocated)
+
+
+def bench_iprange_create(workload):
+    """IPRange(cidr=...)"""
+    cidrs = [CIDR(cidr_string=cidr_string) for cidr_string in workload.allocated]
+    start = time.perf_counter()
+    for cidr in cidrs:
+        IPRange(cidr=cidr)
+    return len(cidrs), time.perf_counter() - start
+
+
+def bench_cidr_divide(workload):
+    """Iterating CIDR.divide(...) of the network into ~size subnets."""
+    network = CIDR(cidr_string=workload.network)
+    target_mask = min(network.mask + max(workload.size - 1, 1).bit_length(), CIDR.MAX_MASK)
+    return sum(1 for _ in network.divide(target_mask))
+
+
+def bench_from_ip_range(workload):
+    """CIDR.from_ip_range(...) of arbitrary ranges."""
+    ranges = [IPRange(first_ip=IP._new(first), second_ip=IP._new(last)) for first, last in workload.ranges]
+    start = time.perf_counter()
+    for ip_range in ranges:
+        CIDR.from_ip_range(ip_range)
+    return len(ranges), time.perf_counter() - start
+
+
+def bench_calculator(workload):
+    """End-to-end unused_subnet_calculator run: parse, validate, compute, and write the unused subnets."""
+    out = io.StringIO()
+    unused_subnet_calculator.write_cidrs(
+        unused_subnet_calculator.unused_cidrs(workload.network, workload.allocated), "text", out
+    )
+    return workload.size
+
+
+BENCHMARKS = {
+    "ip_parse": bench_ip_parse,
+    "ip_compare": bench_ip_compare,
+    "cidr_parse": bench_cidr_parse,
+    "iprange_create": bench_iprange_create,
+    "cidr_divide": bench_cidr_divide,
+    "from_ip_range": bench_from_ip_range,
+    "calculator": bench_calculator,
+}
+
+
+def _run_once(bench, workload):
+    """Runs a benchmark. Returns (# operations, seconds)."""
+    gc.collect()
+    start = time.perf_counter()
+    result = bench(workload)
+    elapsed = time.perf_counter() - start
+    # benchmarks with setup work time their measured section themselves
+    return result if isinstance(result, tuple) else (result, elapsed)
+
+
+def _peak_memory(bench, workload):
+    """Peak traced memory (bytes) allocated while running a benchmark."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        bench(workload)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(sizes, seed, names, repeat=3, memory=True, log=sys.stderr):
+    """Runs the benchmarks over every size. Returns the results document."""
+    results = []
+    for size in sizes:
+        workload = Workload(size, seed)
+        for name in names:
+            bench = BENCHMARKS[name]
+            # best of `repeat` runs, the least disturbed by other processes
+            operations, seconds = min((_run_once(bench, workload) for _ in range(repeat)), key=lambda run: run[1])
+            result = {
+                "name": name,
+                "size": size,
+                "operations": operations,
+                "seconds": seconds,
+                "ops_per_second": operations / seconds if seconds else None,
+                "peak_memory_bytes": _peak_memory(bench, workload) if memory else None,
+            }
+            results.append(result)
+            print(f"{name:>16} n={size:<8} {seconds:10.4f}s {result['ops_per_second'] or 0:14,.0f} ops/s" +
+                  (f" {result['peak_memory_bytes'] / 2**20:10.1f} MiB" if memory else ""), file=log)
+    return {
+        "meta": {
+            "seed": seed,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD, log=sys.stderr):
+    """Prints the slowdown of each benchmark vs a baseline results document. Returns the # of regressions."""
+    baseline_seconds = {(r["name"], r["size"]): r["seconds"] for r in baseline["results"]}
+    regressions = 0
+    for result in current["results"]:
+        before = baseline_seconds.get((result["name"], result["size"]))
+        if not before:
+            continue
+        ratio = result["seconds"] / before
+        flag = "REGRESSION" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"{result['name']:>16} n={result['size']:<8} {ratio:6.2f}x vs baseline {flag}", file=log)
+    return regressions
+
+
+def main(argv=None):
+    """Runs the suite. Returns the exit code (1 if --compare found regressions)."""
+    parser = argparse.ArgumentParser(description="Benchmarks for the networking package and calculators.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="# of allocated subnets in each synthetic network.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic networks.")
+    parser.add_argument("--bench", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS),
+                        help="Benchmarks to run (default: all).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs per benchmark (best is kept).")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the (slower) peak memory runs.")
+    parser.add_argument("--output", help="Filepath to write the JSON results to (default: stdout).")
+    parser.add_argument("--compare", help="Filepath of previous JSON results to compare against.")
+    args = parser.parse_args(argv)
+
+    current = run(args.sizes, args.seed, args.bench, args.repeat, not args.no_memory)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(current, output, indent=2)
+    else:
+        json.dump(current, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare, "r") as baseline:
+            return int(compare(current, json.load(baseline)) > 0)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+ip_classifier.py
+
+Labels a stream of IP addresses with the allocated subnet CIDR each one falls in.
+"""
+
+import io
+import csv
+import json
+import itertools
+import argparse
+import sys
+
+from networking import CIDR, CIDRReader, IPClassifier
+
+FORMATS = ("text", "jsonl", "csv")
+CSV_HEADER = "ip,cidr\n"
+# # of IPs classified (and written) per batch
+BATCH_SIZE = 1 << 20
+
+
+def _format_line(ip, label, fmt):
+    """Formats a single classification as an output line."""
+    if fmt == "text":
+        return f"{ip} {label}\n"
+    # valid IPs are digits and dots, and labels CIDRs or words, so only invalid lines (copied verbatim) need escaping
+    if fmt == "csv":
+        if label != IPClassifier.INVALID:
+            return f"{ip},{label}\n"
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerow((ip, label))
+        return buffer.getvalue()
+    if label != IPClassifier.INVALID:
+        return f'{{"ip": "{ip}", "cidr": "{label}"}}\n'
+    return f'{{"ip": {json.dumps(ip)}, "cidr": "{label}"}}\n'
+
+
+def _classify_batch(classifier, batch):
+    """Indices (into classifier.cidrs, -1 if unallocated) of a batch of IP strings, with None for malformed ones."""
+    try:
+        return classifier.classify_strings(batch).tolist()
+    except ImportError:
+        # no numpy: IPs are parsed (by the same rule) and bisected one by one
+        nums = [IPClassifier.parse_ip(ip) for ip in batch]
+        return [None if num is None else classifier.index(num) for num in nums]
+    except ValueError:
+        # malformed lines: set them aside, and classify the others in one pass
+        valid = [IPClassifier.is_ip_string(ip) for ip in batch]
+        found = iter(classifier.classify_strings([ip for ip, ok in zip(batch, valid) if ok]).tolist())
+        return [next(found) if ok else None for ok in valid]
+
+
+def classify_stream(classifier, lines, fmt="text", out=None, errors=None):
+    """
+    Classifies (line number, IP string) pairs (EX. CIDRReader.lines()) in batches and writes one line per IP.
+
+    With numpy, each batch is parsed and looked up in a single vectorized pass; without it, IPs are bisected one by one.
+    Malformed IPs are labeled invalid, and appended to errors (if given) as (line number, line, message).
+    Returns the # of IPs classified.
+    """
+    out = sys.stdout if out is None else out
+    if fmt == "csv":
+        out.write(CSV_HEADER)
+    # CIDR strings by index, with "unallocated" at -1
+    names = [str(cidr) for cidr in classifier.cidrs] + [IPClassifier.UNALLOCATED]
+    classified = 0
+    lines = iter(lines)
+    while True:
+        batch = list(itertools.islice(lines, BATCH_SIZE))
+        if not batch:
+            break
+        ips = [ip for _, ip in batch]
+        indices = _classify_batch(classifier, ips)
+        out.write("".join(_format_line(ip, IPClassifier.INVALID if i is None else names[i], fmt)
+                          for ip, i in zip(ips, indices)))
+        classified += len(batch)
+        if None in indices:
+            for (line_number, ip), i in zip(batch, indices):
+                if i is None:
+                    classified -= 1
+                    if errors is not None:
+                        errors.append((line_number, ip, f"{ip}: {IPClassifier.IP_STRING_ERROR}"))
+    out.flush()
+    return classified
+
+
+def parse_args(argv=None):
+    """Parses command line args."""
+    parser = argparse.ArgumentParser()
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument(
+        "-a",
+        "--allocated-subnet-list",
+        help="List of allocated subnet CIDRs to label IPs with. Conflicts with (-f|--allocated-subnet-file)",
+        dest="allocated",
+        type=str,
+        nargs="*"
+    )
+    group.add_argument(
+        "-f",
+        "--allocated-subnet-file",
+        help="Relative filepath containing newline-separated allocated subnet CIDRs to label IPs with " +
+             "(# comments allowed, gzip supported). Conflicts with (-a|--allocated-subnet-list)",
+        dest="allocated_file",
+        type=str
+    )
+    parser.add_argument(
+        "-i",
+        "--ip-file",
+        help="Relative filepath containing newline-separated IPs to classify (# comments allowed, gzip supported). " +
+             "Defaults to stdin.",
+        dest="ip_file",
+        type=str,
+        default="-"
+    )
+    parser.add_argument(
+        "--format",
+        help="Output format: text (IP CIDR, default), jsonl, or csv. Unallocated IPs are labeled unallocated, " +
+             "and malformed ones invalid.",
+        dest="format",
+        choices=FORMATS,
+        default="text"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Runs the classifier. Returns the exit code."""
+    args = parse_args(argv)
+    try:
+        if args.allocated is not None:
+            allocated = [CIDR(cidr_string=cidr_string) for cidr_string in args.allocated]
+        else:
+            reader = CIDRReader(args.allocated_file)
+            allocated = list(reader)
+            if reader.errors:
+                raise RuntimeError(reader.format_errors())
+        classifier = IPClassifier(allocated)
+        ip_reader = CIDRReader(args.ip_file)
+        # malformed IPs don't stop the stream: they are labeled, and reported at the end
+        classify_stream(classifier, ip_reader.lines(), args.format, errors=ip_reader.errors)
+        if ip_reader.errors:
+            raise RuntimeError(ip_reader.format_errors(kind="IP"))
+    except Exception as e:
+        print(f"ERROR: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,17 +4,25 @@ CIDR.py
 Contains class definition.
 """
 
-import math
-import copy
-import itertools
-
-from networking import IP, IPRange
+from networking import IP, IPRange, CIDRDivision
 
 
 class CIDR:
-    """Represents an IPv4 CIDR Block."""
+    """
+    Represents an IPv4 CIDR Block (CIDRv6 is the 128-bit family).
+
+    Instances are immutable. The block is described by its numerical first and
+    last addresses (first_num, last_num); the string and IPRange representations
+    are only built when asked for.
+    """
+    __slots__ = ("base_ip", "mask", "hosts", "first_num", "last_num", "_cidr_range")
+
     MAX_MASK = 32
     MIN_MASK = 0
+    # class of the addresses within
+    IP_CLASS = IP
+    # example string for error messages
+    EXAMPLE = "10.0.0.0/5"
 
     def __init__(self, *, cidr_string=None, ip=None, mask=None):
         """
@@ -35,79 +43,91 @@ class CIDR:
                 if (len(split) != 2):
                     raise ValueError("CIDR string is incorrectly formatted.")
                 # mask must be parse-able as an integer
-                self.mask = int(split[1])
+                mask = int(split[1])
                 # mask must fit into range
-                CIDR.validate_mask(self.mask)
+                self.validate_mask(mask)
             except:
                 # propagate error to client
-                raise ValueError(f"{cidr_string}: format is IP/mask, EX. 10.0.0.0/5, where mask <= 32 and >= 0")
+                raise ValueError(f"{cidr_string}: format is IP/mask, EX. {self.EXAMPLE}, " +
+                                 f"where mask <= {self.MAX_MASK} and >= {self.MIN_MASK}")
 
             # create an IP object
-            self.base_ip = IP(ip_string=split[0])
-            # string representation
-            self.cidr_string = cidr_string
-        elif isinstance(ip, IP) and type(mask) == int:
-            self.mask = mask
+            ip = self.IP_CLASS(ip_string=split[0])
+        elif isinstance(ip, IP) and ip.BITS == self.MAX_MASK and type(mask) == int:
             # mask must fit into range
-            CIDR.validate_mask(self.mask)
-            # references IP object
-            self.base_ip = copy.deepcopy(ip)
-            # string representation
-            self.cidr_string = f"{str(self.base_ip)}/{str(self.mask)}"
+            self.validate_mask(mask)
         else:
             raise ValueError("CIDR input must be either cidr_string or ip and mask.")
-        # calculate total hosts
-        self.hosts = CIDR.get_hosts(self.mask)
-        # IP range representation
-        self.cidr_range = IPRange(cidr=self)
+        self._set(ip, mask)
         return
 
-    def print_summary(self):
-        """Prints summary."""
-        print(f"CIDR Notation: {self.cidr_string}")
-        print(f"IP Mask: {self.mask}")
-        print(f"IP Range: {self.cidr_range}")
-        print(f"Total Hosts: {self.hosts}\n")
+    @classmethod
+    def _new(cls, base_ip, mask):
+        """Create a CIDR from a trusted base IP and mask, skipping validation."""
+        cidr = cls.__new__(cls)
+        cidr._set(base_ip, mask)
+        return cidr
+
+    def _set(self, base_ip, mask):
+        """Fills in all slots. IPs are immutable, so base_ip is referenced, not copied."""
+        host_bits = self.MAX_MASK - mask
+        first_num = (base_ip.ip_num >> host_bits) << host_bits
+        hosts = 1 << host_bits
+        setattr_ = object.__setattr__
+        setattr_(self, "base_ip", base_ip)
+        setattr_(self, "mask", mask)
+        # total hosts
+        setattr_(self, "hosts", hosts)
+        # numerical first/last addresses of the block
+        setattr_(self, "first_num", first_num)
+        setattr_(self, "last_num", first_num + hosts - 1)
+        return
+
+    @property
+    def cidr_string(self):
+        """String representation, EX. 10.0.0.0/8"""
+        return f"{self.base_ip}/{self.mask}"
+
+    @property
+    def cidr_range(self):
+        """IP range representation, built on first access."""
+        try:
+            return self._cidr_range
+        except AttributeError:
+            cidr_range = IPRange._from_ints(self.first_num, self.last_num, type(self.base_ip))
+            object.__setattr__(self, "_cidr_range", cidr_range)
+            return cidr_range
+
+    def print_summary(self, file=None):
+        """Prints summary (to stdout, or a file)."""
+        print(f"CIDR Notation: {self.cidr_string}", file=file)
+        print(f"IP Mask: {self.mask}", file=file)
+        print(f"IP Range: {self.cidr_range}", file=file)
+        print(f"Total Hosts: {self.hosts}\n", file=file)
         return
 
     def is_within(self, other):
-        """Determines if current CIDR is within other CIDR."""
-        return self.cidr_range.is_within(other.cidr_range)
+        """Determines if current CIDR is within other CIDR (of the same address family)."""
+        return self.MAX_MASK == other.MAX_MASK and other.first_num <= self.first_num and self.last_num <= other.last_num
 
     def does_overlap(self, other):
-        """Determines if current CIDR overlaps with other CIDR."""
-        return self.cidr_range.does_overlap(other.cidr_range)
+        """Determines if current CIDR overlaps with other CIDR (of the same address family)."""
+        return self.MAX_MASK == other.MAX_MASK and self.first_num <= other.last_num and other.first_num <= self.last_num
 
     def divide(self, target_mask):
         """
         Divide CIDR into multiple CIDRs given a target mask > the current mask.
 
+        Returns a lazy CIDRDivision view: each subnet is computed directly as
+        base + i * block_size, on demand, so nothing is materialized up front.
+
         General behavior:
 
-        If the target mask is < the current mask, return an empty list
-        If the target mask is = the current mask, return the CIDR as a single object in a list.
+        If the target mask is < the current mask, the view is empty.
+        If the target mask is = the current mask, the view holds the CIDR as a single object.
         """
-        current_mask = self.mask
-
-        if current_mask > target_mask:
-            return []
-
-        temp = [[CIDR(ip=self.base_ip, mask=self.mask)], []] # will juggle CIDRS between the 2 nested lists until finally determined
-        ind = 0
-        while current_mask < target_mask:
-            other = (ind + 1) % 2 # will cycle between 0 and 1 for the temp lists
-            for cidr in temp[ind]:
-                # split into 2 and increase mask by 1
-                # first is the base_ip with an increased mask
-                temp[other].append(CIDR(ip=cidr.base_ip, mask=cidr.mask+1))
-                # second is the second IP of the above CIDR + 1, with the same mask
-                temp[other].append(CIDR(ip=temp[other][-1].cidr_range[1].add_hosts(1), mask=cidr.mask+1))
-            temp[ind] = [] # reset list once processed
-            ind = other
-            current_mask += 1
-
-        # merges list of lists (temp) into a single list
-        return list(itertools.chain.from_iterable(temp))
+        self.validate_mask(target_mask)
+        return CIDRDivision(self, target_mask)
 
     @classmethod
     def validate_mask(cls, mask):
@@ -116,10 +136,63 @@ class CIDR:
             raise ValueError(f"Mask {mask} out of range.")
         return
 
+    @staticmethod
+    def family(string):
+        """CIDR class for an IP or CIDR string: CIDRv6 if it holds a ':', else CIDR."""
+        # imported here, as CIDRv6 subclasses CIDR
+        from networking import CIDRv6
+        return CIDRv6 if ":" in string else CIDR
+
     @classmethod
     def get_hosts(cls, mask):
         """Gets hosts using CIDR mask."""
-        return 2**(cls.MAX_MASK - mask)
+        return 1 << (cls.MAX_MASK - mask)
+
+    @classmethod
+    def find_overlaps(cls, cidrs, fail_fast=False):
+        """
+        Finds every pair of overlapping CIDRs in O(n log n + k) using a sort-then-sweep.
+
+        CIDR blocks are either disjoint or nested, so every overlap is a containment.
+        Returns a list of (outer, inner) tuples where outer contains inner
+        (identical blocks contain each other). With fail_fast, stops at the first pair.
+        """
+        overlaps = []
+        # by address family (IPv4 and IPv6 never overlap), first address, then supernets before their subnets
+        ordered = sorted(cidrs, key=lambda cidr: (cidr.MAX_MASK, cidr.first_num, cidr.mask))
+        # blocks that are still "open" at the current address, outermost first.
+        # since blocks nest, every open block contains the current one.
+        open_cidrs = []
+        for cidr in ordered:
+            while open_cidrs and (open_cidrs[-1].last_num < cidr.first_num or open_cidrs[-1].MAX_MASK != cidr.MAX_MASK):
+                open_cidrs.pop()
+            for outer in open_cidrs:
+                overlaps.append((outer, cidr))
+                if fail_fast:
+                    return overlaps
+            open_cidrs.append(cidr)
+        return overlaps
+
+    @classmethod
+    def range_blocks(cls, first_num, last_num):
+        """
+        Generates the minimal (base, mask) blocks that exactly cover the numerical addresses first_num to last_num.
+
+        Integer-only: each block is as large as both the alignment of its base
+        (trailing zero bits) and the remaining hosts (bit length) allow.
+        """
+        max_mask = cls.MAX_MASK
+        while first_num <= last_num:
+            # https://stackoverflow.com/questions/33443914/how-to-convert-ip-address-range-to-cidr-in-java
+            # trailing zero bits of the base: the largest block that starts here without covering IPs before it.
+            # (a base of 0 is aligned to every block size)
+            align_bits = (first_num & -first_num).bit_length() - 1 if first_num else max_mask
+            # largest block that doesn't overshoot the remaining hosts
+            span_bits = (last_num - first_num + 1).bit_length() - 1
+            host_bits = min(align_bits, span_bits)
+            yield first_num, max_mask - host_bits
+            first_num += 1 << host_bits
+        return
 
     @classmethod
     def from_ip_range(cls, ip_range):
@@ -128,38 +201,97 @@ class CIDR:
         
         The reason this isn't in the constructor is that it returns a list of CIDRs.
         """
-        ip_range_copy = copy.deepcopy(ip_range) # will be modifying, so don't want to touch ref
-        ipr = ip_range_copy.range
-        hosts = ip_range_copy.hosts
-
-        cidrs = []
-        start_ip = ipr[0]
-        end_ip = ipr[1]
-        # creating CIDRs using start_ip and trying to determine a mask that covers
-        # as many IP addresses as possible without overshooting.
-        # "mask_for_hosts" attempts to look at remaining hosts and find a matching mask.
-        # however, it can overshoot, which is why "restricted_mask" is calculated.
-        # the max is taken (the larger the mask, the less IPs covered)
-        # and the IP is incremented by the # of hosts that are covered. 
-        while (start_ip <= end_ip):
-            # mask that covers remaining hosts
-            mask_for_hosts = CIDR.MAX_MASK - math.floor(math.log(hosts, 2))
-            # https://stackoverflow.com/questions/33443914/how-to-convert-ip-address-range-to-cidr-in-java
-            # mask that first marks the location of first 1 from lower bit to higher bit of start IP.
-            # then, a log_2 is calculated over that value so determine the # of bits for the mask.
-            # this is calculated to avoid the mask covering IPs that we don't want.
-            restricted_mask = CIDR.MAX_MASK - math.floor(math.log(start_ip._to_numerical() & (-start_ip._to_numerical()), 2))
-            # take the max of the masks, using the most restricted mask
-            mask = max(mask_for_hosts, restricted_mask)
-            # append a CIDR using the start_ip and the calculated mask
-            cidrs.append(CIDR(ip=start_ip, mask=mask))
-            # host computation
-            hosts_covered = CIDR.get_hosts(mask)
-            hosts -= hosts_covered
-            # increment start_ip with hosts covered by the mask
-            start_ip.add_hosts(hosts_covered)
-        return cidrs
+        first_ip, last_ip = ip_range.range
+        ip_class = type(first_ip)
+        if ip_class.BITS != cls.MAX_MASK:
+            raise ValueError(f"{ip_range}: {ip_class.BITS}-bit IP range can't be converted to {cls.__name__}s.")
+        return [cls._new(ip_class._new(base), mask) for base, mask in cls.range_blocks(first_ip.ip_num, last_ip.ip_num)]
+
+    @classmethod
+    def collapse(cls, cidrs):
+        """
+        Summarizes CIDRs (or CIDR strings) into the minimal list of CIDRs covering the same addresses, in order.
+
+        Overlapping and adjacent blocks are merged in one sort-and-merge pass, O(n log n).
+        Only one integer per block is kept while sorting, so the input can be a large stream (EX. a CIDRReader).
+        """
+        # (first address, mask) packed into one int: sorts by address, then supernets first
+        keys = sorted(cls._collapse_key(cidr) for cidr in cidrs)
+        ip_class = cls.IP_CLASS
+        collapsed = []
+        first_num = last_num = None
+        for key in keys:
+            base, mask = key >> 8, key & 0xFF
+            if last_num is not None and base <= last_num + 1:
+                # overlapping or adjacent: extend the current run
+                last_num = max(last_num, base + (1 << (cls.MAX_MASK - mask)) - 1)
+                continue
+            if last_num is not None:
+                collapsed.extend(cls._new(ip_class._new(b), m) for b, m in cls.range_blocks(first_num, last_num))
+            first_num, last_num = base, base + (1 << (cls.MAX_MASK - mask)) - 1
+        if last_num is not None:
+            collapsed.extend(cls._new(ip_class._new(b), m) for b, m in cls.range_blocks(first_num, last_num))
+        return collapsed
+
+    @classmethod
+    def _collapse_key(cls, cidr):
+        """Sort key of a CIDR (or CIDR string) for collapse."""
+        if isinstance(cidr, str):
+            cidr = cls(cidr_string=cidr)
+        elif cidr.MAX_MASK != cls.MAX_MASK:
+            raise ValueError(f"{cidr}: {cidr.MAX_MASK}-bit CIDR can't be collapsed with {cls.__name__}s.")
+        return (cidr.first_num << 8) | cidr.mask
+
+    def __setattr__(self, name, value):
+        """CIDRs are immutable."""
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __delattr__(self, name):
+        """CIDRs are immutable."""
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __copy__(self):
+        """Immutable, so copies are unnecessary."""
+        return self
+
+    def __deepcopy__(self, memo):
+        """Immutable, so copies are unnecessary."""
+        return self
+
+    def __reduce__(self):
+        """Pickle support (slots + immutability bypass the default protocol)."""
+        return (type(self)._new, (self.base_ip, self.mask))
 
     def __str__(self):
         """String representation."""
         return self.cidr_string
+
+    def __repr__(self):
+        """Debug representation."""
+        return f"{type(self).__name__}('{self}')"
+
+    def __hash__(self):
+        """Hash on the block (first address and mask)."""
+        return hash((self.first_num, self.mask))
+
+    def __eq__(self, other):
+        """== comparator: same block of addresses."""
+        if not isinstance(other, CIDR):
+            return NotImplemented
+        return self.first_num == other.first_num and self.mask == other.mask and self.MAX_MASK == other.MAX_MASK
+
+    def __lt__(self, other):
+        """< comparator: by first address, then larger blocks (supernets) first."""
+        return (self.first_num, self.mask) < (other.first_num, other.mask)
+
+    def __le__(self, other):
+        """<= comparator."""
+        return (self.first_num, self.mask) <= (other.first_num, other.mask)
+
+    def __gt__(self, other):
+        """> comparator."""
+        return (self.first_num, self.mask) > (other.first_num, other.mask)
+
+    def __ge__(self, other):
+        """>= comparator."""
+        return (self.first_num, self.mask) >= (other.first_num, other.mask)
@@ -0,0 +1,238 @@
+"""
+CIDRArray.py
+
+Contains class definition.
+"""
+
+import warnings
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, and only needed by CIDRArray
+    np = None
+
+from networking import IP, CIDR, CIDRReader
+
+
+class CIDRArray:
+    """
+    Columnar array of IPv4 CIDR blocks, backed by NumPy.
+
+    Stores parallel uint32 base and uint8 mask arrays instead of one CIDR object
+    (plus its IPs) per block, so whole inventories can be parsed, sorted and
+    queried in vectorized batches. Bases are kept exactly as given (EX. 10.0.0.5/24),
+    so converting to and from CIDR objects is lossless.
+    """
+    __slots__ = ("bases", "masks")
+
+    # "10.0.0.0/8" -> "10 0 0 0 8"
+    _SEPARATORS = str.maketrans("./", "  ")
+
+    def __init__(self, bases=(), masks=()):
+        """
+        Constructor: Creates an array from parallel sequences of numerical base IPs and masks.
+        """
+        if np is None:
+            raise ImportError("CIDRArray requires numpy (pip install numpy).")
+        bases = np.asarray(bases, dtype=np.int64).ravel()
+        masks = np.asarray(masks, dtype=np.int64).ravel()
+        if len(bases) != len(masks):
+            raise ValueError(f"CIDRArray bases ({len(bases)}) and masks ({len(masks)}) must be the same length.")
+        if len(bases) and (bases.min() < IP.MIN_NUM or bases.max() > IP.MAX_NUM):
+            raise ValueError(f"CIDRArray bases must be <= {IP.MAX_NUM} and >= {IP.MIN_NUM}.")
+        if len(masks) and (masks.min() < CIDR.MIN_MASK or masks.max() > CIDR.MAX_MASK):
+            raise ValueError(f"CIDRArray masks must be <= {CIDR.MAX_MASK} and >= {CIDR.MIN_MASK}.")
+        self.bases = bases.astype(np.uint32)
+        self.masks = masks.astype(np.uint8)
+        return
+
+    @classmethod
+    def _from_arrays(cls, bases, masks):
+        """Create a CIDRArray from trusted uint32/uint8 arrays, skipping validation."""
+        array = cls.__new__(cls)
+        array.bases = bases
+        array.masks = masks
+        return array
+
+    @classmethod
+    def from_strings(cls, cidr_strings):
+        """
+        Parses CIDR strings (EX. 10.0.0.0/8) in one batch.
+
+        Raises ValueError for the first malformed string, with the same message as CIDR.
+        """
+        if np is None:
+            raise ImportError("CIDRArray requires numpy (pip install numpy).")
+        lines = [s.strip() for s in cidr_strings]
+        if not lines:
+            return cls()
+        # every line must have the IP/mask shape on its own, or tokens of neighbouring lines could pair up wrongly
+        malformed = CIDRArray._malformed(lines, "." * (IP.OCTETS - 1) + "/")
+        if malformed.any():
+            cls._raise_for(lines[int(np.argmax(malformed))])
+        text = "\n".join(lines)
+        # split all lines into octet/mask tokens and convert them in a single C pass
+        with warnings.catch_warnings():
+            # unparseable input truncates the result (and warns) in older numpy versions
+            warnings.simplefilter("ignore", DeprecationWarning)
+            try:
+                values = np.fromstring(text.translate(cls._SEPARATORS), dtype=np.int64, sep=" ")
+            except ValueError:
+                values = np.empty(0, dtype=np.int64)
+        if len(values) != len(lines) * (IP.OCTETS + 1):
+            # locate the offending line to report it
+            for line in lines:
+                CIDR(cidr_string=line)
+            raise ValueError("CIDR strings could not be parsed.")
+        values = values.reshape(len(lines), IP.OCTETS + 1)
+        octets, masks = values[:, :IP.OCTETS], values[:, IP.OCTETS]
+        valid = ((octets >= IP.MIN_OCTET_NUM) & (octets <= IP.MAX_OCTET_NUM)).all(axis=1)
+        # first octet cannot be 0 as it is reserved
+        valid &= octets[:, 0] != 0
+        valid &= (masks >= CIDR.MIN_MASK) & (masks <= CIDR.MAX_MASK)
+        if not valid.all():
+            cls._raise_for(lines[int(np.argmin(valid))])
+        bases = (octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]
+        return cls._from_arrays(bases.astype(np.uint32), masks.astype(np.uint8))
+
+    @staticmethod
+    def _malformed(lines, separators):
+        """
+        Flags (boolean array) the stripped lines that aren't tokens of 1 to 3 ASCII digits joined by
+        exactly the given separators, in order (EX. "..." for IPs, ".../" for CIDRs).
+
+        Checked per line, vectorized over the joined text.
+        """
+        count = len(lines)
+        raw = np.frombuffer("\n".join(lines).encode(), dtype=np.uint8)
+        newline = raw == ord("\n")
+        digit = (raw >= ord("0")) & (raw <= ord("9"))
+        expected = np.frombuffer(separators.encode(), dtype=np.uint8)
+        is_separator = np.zeros(len(raw), dtype=bool)
+        for separator in set(expected.tolist()):
+            is_separator |= raw == separator
+        before = np.concatenate(([False], digit[:-1]))
+        after = np.concatenate((digit[1:], [False]))
+        # other characters, empty tokens (separators not between digits), and tokens over 3 digits
+        bad = ~(digit | is_separator | newline)
+        bad |= is_separator & ~(before & after)
+        bad[3:] |= digit[3:] & digit[2:-1] & digit[1:-2] & digit[:-3]
+        # fast path: the separators and newlines of the whole text are exactly the expected ones, line after line
+        structure = np.frombuffer((separators + "\n").encode() * count, dtype=np.uint8)[:-1]
+        if not bad.any() and np.array_equal(raw[is_separator | newline], structure):
+            return np.zeros(count, dtype=bool)
+        if np.count_nonzero(newline) != count - 1:
+            # a string holds a newline itself: blank it out so it can't shift the lines
+            return CIDRArray._malformed(["" if "\n" in line else line for line in lines], separators)
+        # line index of every character
+        line_of = np.cumsum(newline)
+        malformed = np.bincount(line_of[bad], minlength=count) > 0
+        # the separators of every line, in order
+        positions = np.flatnonzero(is_separator)
+        separator_line = line_of[positions]
+        per_line = np.bincount(separator_line, minlength=count)
+        malformed |= per_line != len(expected)
+        ordinal = np.arange(len(positions)) - (np.cumsum(per_line) - per_line)[separator_line]
+        misplaced = raw[positions] != expected[np.minimum(ordinal, len(expected) - 1)]
+        malformed |= np.bincount(separator_line[misplaced], minlength=count) > 0
+        return malformed
+
+    @classmethod
+    def from_file(cls, path):
+        """Parses a file of newline-separated CIDRs (see CIDRReader: # comments, gzip and - for stdin)."""
+        return cls.from_strings([line for _, line in CIDRReader(path).lines()])
+
+    @classmethod
+    def from_cidrs(cls, cidrs):
+        """Converts CIDR objects into a CIDRArray."""
+        if np is None:
+            raise ImportError("CIDRArray requires numpy (pip install numpy).")
+        cidrs = list(cidrs)
+        bases = np.fromiter((cidr.base_ip.ip_num for cidr in cidrs), dtype=np.uint32, count=len(cidrs))
+        masks = np.fromiter((cidr.mask for cidr in cidrs), dtype=np.uint8, count=len(cidrs))
+        return cls._from_arrays(bases, masks)
+
+    @staticmethod
+    def _raise_for(cidr_string):
+        """Re-parses a single string with CIDR to raise its error."""
+        CIDR(cidr_string=cidr_string)
+        raise ValueError(f"{cidr_string}: format is IP/mask, EX. 10.0.0.0/5, where mask <= 32 and >= 0")
+
+    def to_cidrs(self):
+        """Converts back into a list of CIDR objects."""
+        return [CIDR._new(IP._new(base), mask) for base, mask in zip(self.bases.tolist(), self.masks.tolist())]
+
+    def to_strings(self):
+        """Converts into a list of CIDR strings."""
+        return [str(cidr) for cidr in self.to_cidrs()]
+
+    def _hostmasks(self):
+        """Host bits of each block (EX. /24 -> 0xFF), as uint64."""
+        host_bits = (CIDR.MAX_MASK - self.masks.astype(np.int64)).astype(np.uint64)
+        return (np.uint64(1) << host_bits) - np.uint64(1)
+
+    @property
+    def first(self):
+        """First address of each block (uint32)."""
+        return (self.bases.astype(np.uint64) & ~self._hostmasks()).astype(np.uint32)
+
+    @property
+    def last(self):
+        """Last address of each block (uint32)."""
+        return (self.bases.astype(np.uint64) | self._hostmasks()).astype(np.uint32)
+
+    @property
+    def hosts(self):
+        """Total hosts of each block (uint64, since a /0 holds 2**32)."""
+        return self._hostmasks() + np.uint64(1)
+
+    def _bounds(self, other):
+        """First/last addresses of a CIDR (scalars) or a CIDRArray (arrays) for comparisons."""
+        if isinstance(other, CIDRArray):
+            if len(other) != len(self):
+                raise ValueError(f"CIDRArray lengths differ ({len(self)} vs {len(other)}).")
+            return other.first, other.last
+        return np.uint32(other.first_num), np.uint32(other.last_num)
+
+    def is_within(self, other):
+        """Determines, per block, if it is within a CIDR (or the matching block of another CIDRArray)."""
+        other_first, other_last = self._bounds(other)
+        return (self.first >= other_first) & (self.last <= other_last)
+
+    def does_overlap(self, other):
+        """Determines, per block, if it overlaps a CIDR (or the matching block of another CIDRArray)."""
+        other_first, other_last = self._bounds(other)
+        return (self.first <= other_last) & (self.last >= other_first)
+
+    def argsort(self):
+        """Indices that sort the blocks by first address, then supernets before their subnets."""
+        return np.lexsort((self.masks, self.first))
+
+    def sort(self):
+        """Returns a sorted copy (see argsort)."""
+        return self[self.argsort()]
+
+    def __len__(self):
+        """# of blocks."""
+        return len(self.bases)
+
+    def __getitem__(self, index):
+        """[] override. Integers return a CIDR; slices, index arrays and boolean masks return a CIDRArray."""
+        if isinstance(index, (int, np.integer)):
+            return CIDR._new(IP._new(int(self.bases[index])), int(self.masks[index]))
+        return CIDRArray._from_arrays(self.bases[index], self.masks[index])
+
+    def __iter__(self):
+        """Iterates as CIDR objects."""
+        for base, mask in zip(self.bases.tolist(), self.masks.tolist()):
+            yield CIDR._new(IP._new(base), mask)
+
+    def __eq__(self, other):
+        """== comparator: same blocks, in the same order."""
+        if not isinstance(other, CIDRArray):
+            return NotImplemented
+        return bool(np.array_equal(self.first, other.first) and np.array_equal(self.masks, other.masks))
+
+    def __repr__(self):
+        """Debug representation."""
+        return f"{type(self).__name__}({len(self)} blocks)"
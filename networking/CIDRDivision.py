@@ -0,0 +1,106 @@
+"""
+CIDRDivision.py
+
+Contains class definition.
+"""
+
+from collections.abc import Sequence
+
+
+class CIDRDivision(Sequence):
+    """
+    Lazy, read-only view of a CIDR divided into equally sized subnets.
+
+    Nothing is materialized: the i-th subnet is computed directly as
+    base + i * block_size, so len(), indexing, slicing, membership and
+    (reverse) iteration never build more than the CIDRs asked for.
+    IPv6 divisions can hold more subnets than len() can return
+    (more than sys.maxsize); size has no such limit.
+    """
+    __slots__ = ("cidr", "target_mask", "block_size", "_indices")
+
+    def __init__(self, cidr, target_mask, _indices=None):
+        """
+        Constructor.
+
+        If the target mask is < the CIDR's mask, the division is empty.
+        """
+        self.cidr = cidr
+        self.target_mask = target_mask
+        self.block_size = cidr.get_hosts(target_mask)
+        if _indices is None:
+            # 2**(target_mask - mask) subnets, or none if the target mask is too small
+            count = 1 << (target_mask - cidr.mask) if target_mask >= cidr.mask else 0
+            _indices = range(count)
+        # a range object keeps slices lazy and O(1)
+        self._indices = _indices
+        return
+
+    def _subnet(self, i):
+        """Builds the i-th subnet."""
+        cidr = self.cidr
+        ip = type(cidr.base_ip)._new(cidr.first_num + i * self.block_size)
+        return type(cidr)._new(ip, self.target_mask)
+
+    @property
+    def size(self):
+        """# of subnets, as an unbounded int (computed from the range, since len() of a range is capped)."""
+        indices = self._indices
+        if indices.step > 0:
+            return max(0, (indices.stop - indices.start + indices.step - 1) // indices.step)
+        return max(0, (indices.start - indices.stop - indices.step - 1) // -indices.step)
+
+    def __len__(self):
+        """# of subnets. Raises OverflowError past sys.maxsize: use size."""
+        return self.size
+
+    def __bool__(self):
+        """Whether there is any subnet."""
+        return self.size > 0
+
+    def __getitem__(self, index):
+        """[] override. Slices return another lazy view."""
+        if isinstance(index, slice):
+            return CIDRDivision(self.cidr, self.target_mask, self._indices[index])
+        return self._subnet(self._indices[index])
+
+    def __iter__(self):
+        """Streams subnets in ascending order."""
+        subnet = self._subnet
+        for i in self._indices:
+            yield subnet(i)
+
+    def __reversed__(self):
+        """Streams subnets in descending order."""
+        subnet = self._subnet
+        for i in reversed(self._indices):
+            yield subnet(i)
+
+    def __contains__(self, other):
+        """Whether a CIDR is one of the subnets, in O(1)."""
+        if getattr(other, "mask", None) != self.target_mask or not other.is_within(self.cidr):
+            return False
+        return (other.first_num - self.cidr.first_num) // self.block_size in self._indices
+
+    def index(self, other, start=0, stop=None):
+        """Position of a subnet, in O(1)."""
+        if other not in self:
+            raise ValueError(f"{other} is not in {self}")
+        i = self._indices.index((other.first_num - self.cidr.first_num) // self.block_size)
+        # negative bounds count from the end, as with list.index
+        start, stop, _ = slice(start, stop).indices(self.size)
+        if i < start or i >= stop:
+            raise ValueError(f"{other} is not in {self}")
+        return i
+
+    def count(self, other):
+        """# of occurrences of a subnet (0 or 1)."""
+        return int(other in self)
+
+    def __str__(self):
+        """String representation."""
+        return f"{self.cidr} divided into /{self.target_mask} ({self.size} subnets)"
+
+    def __repr__(self):
+        """Debug representation."""
+        return f"{type(self).__name__}({self.cidr!r}, {self.target_mask})"
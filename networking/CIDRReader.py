@@ -0,0 +1,94 @@
+"""
+CIDRReader.py
+
+Contains class definition.
+"""
+
+import io
+import sys
+import gzip
+
+from networking import CIDR
+
+
+class CIDRReader:
+    """
+    Streams CIDRs out of a newline-separated file, one buffered chunk at a time.
+
+    Blank lines and # comments are skipped, "-" reads stdin, and gzip input is
+    detected from its magic bytes. Lines that fail to parse are collected in
+    errors as (line number, line, message) instead of stopping the read.
+    """
+    GZIP_MAGIC = b"\x1f\x8b"
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, source, max_errors=None, cache=None):
+        """
+        Constructor.
+
+        source is a filepath, "-" for stdin, or a binary file object.
+        Reading stops with a ValueError once more than max_errors lines failed to parse.
+        Lines are parsed through cache (a ParseCache) if one is given.
+        """
+        self.source = source
+        self.max_errors = max_errors
+        self.cache = cache
+        self.errors = []
+        return
+
+    def _open(self):
+        """Opens the source as a buffered binary stream. Returns (stream, should_close)."""
+        if self.source == "-":
+            return sys.stdin.buffer, False
+        if isinstance(self.source, str):
+            return open(self.source, "rb", buffering=CIDRReader.CHUNK_SIZE), True
+        return self.source, False
+
+    def lines(self):
+        """Yields (line number, CIDR string) for every non-blank, non-comment line."""
+        source, should_close = self._open()
+        stream = source if hasattr(source, "peek") else io.BufferedReader(source, CIDRReader.CHUNK_SIZE)
+        if stream.peek(2)[:2] == CIDRReader.GZIP_MAGIC:
+            stream = gzip.GzipFile(fileobj=stream)
+        text = io.TextIOWrapper(stream, encoding="utf-8", errors="replace")
+        try:
+            for line_number, line in enumerate(text, 1):
+                # drop comments, including trailing ones
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    yield line_number, line
+        finally:
+            # unwrap without closing, so the source (EX. stdin) stays open unless we opened it
+            text.detach()
+            if stream is not source and isinstance(stream, io.BufferedReader):
+                stream.detach()
+            if should_close:
+                source.close()
+        return
+
+    def __iter__(self):
+        """Yields a CIDR per parse-able line, recording the others in errors."""
+        self.errors = []
+        parse = self.cache.cidr if self.cache is not None else (lambda line: CIDR.family(line)(cidr_string=line))
+        for line_number, line in self.lines():
+            try:
+                yield parse(line)
+            except ValueError as e:
+                self.errors.append((line_number, line, str(e)))
+                if self.max_errors is not None and len(self.errors) > self.max_errors:
+                    raise ValueError(f"More than {self.max_errors} invalid lines in {self.name}.")
+        return
+
+    @property
+    def name(self):
+        """Readable name of the source."""
+        if self.source == "-":
+            return "stdin"
+        return self.source if isinstance(self.source, str) else getattr(self.source, "name", "stream")
+
+    def format_errors(self, limit=10, kind="CIDR"):
+        """Human-readable summary of (up to limit) parse errors, EX. of kind IP for a file of IPs."""
+        lines = [f"line {line_number}: {message}" for line_number, _, message in self.errors[:limit]]
+        if len(self.errors) > limit:
+            lines.append(f"... and {len(self.errors) - limit} more")
+        return f"{len(self.errors)} invalid {kind}(s) in {self.name}:\n  " + "\n  ".join(lines)
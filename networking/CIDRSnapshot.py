@@ -0,0 +1,239 @@
+"""
+CIDRSnapshot.py
+
+Contains class definition.
+"""
+
+import mmap
+import zlib
+import struct
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, and only needed by to_cidr_array
+    np = None
+
+from networking import CIDR, CIDRv6, CIDRArray
+
+
+class CIDRSnapshot:
+    """
+    Read-only, memory-mapped binary snapshot of a CIDR list.
+
+    Layout (big-endian): a 20-byte header (magic, version, address bits, flags,
+    record count, CRC-32 of the records), then one record per CIDR: the base
+    address (address bits / 8 bytes) and the mask (1 byte), sorted by first
+    address then mask. Records are read straight out of the mapping, so opening
+    a snapshot parses nothing, and lookups binary-search it without loading it in full.
+    """
+    MAGIC = b"CIDRSNAP"
+    VERSION = 1
+    # magic, version, address bits, flags, (padding), record count, CRC-32
+    HEADER = struct.Struct(">8sBBBxII")
+    FLAG_CHECKSUM = 0x01
+    # address bits -> CIDR class
+    FAMILIES = {CIDR.MAX_MASK: CIDR, CIDRv6.MAX_MASK: CIDRv6}
+
+    def __init__(self, source, cidr_class=None, verify=False):
+        """
+        Constructor: Maps a snapshot file (a filepath, or a binary file object backed by a file).
+
+        cidr_class defaults to the family recorded in the header (CIDR or CIDRv6).
+        verify checks the CRC-32 of the records (if the snapshot has one), which reads them all.
+        """
+        self.cidr_class = cidr_class
+        self.name = source if isinstance(source, str) else getattr(source, "name", "stream")
+        try:
+            if isinstance(source, str):
+                with open(source, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files can't be mapped
+            raise ValueError(f"{self.name}: not a CIDR snapshot (empty).")
+        try:
+            self._read_header()
+            if verify:
+                self.verify()
+        except Exception:
+            self.close()
+            raise
+        return
+
+    def _read_header(self):
+        """Validates the header, and fills in count and flags."""
+        if len(self._map) < CIDRSnapshot.HEADER.size:
+            raise ValueError(f"{self.name}: not a CIDR snapshot (too short).")
+        magic, version, bits, flags, count, checksum = CIDRSnapshot.HEADER.unpack_from(self._map, 0)
+        if magic != CIDRSnapshot.MAGIC:
+            raise ValueError(f"{self.name}: not a CIDR snapshot.")
+        if version != CIDRSnapshot.VERSION:
+            raise ValueError(f"{self.name}: unsupported CIDR snapshot version {version}.")
+        if self.cidr_class is None:
+            if bits not in CIDRSnapshot.FAMILIES:
+                raise ValueError(f"{self.name}: unsupported CIDR snapshot address width ({bits} bits).")
+            self.cidr_class = CIDRSnapshot.FAMILIES[bits]
+        if bits != self.cidr_class.MAX_MASK:
+            raise ValueError(f"{self.name}: snapshot holds {bits}-bit addresses, expected {self.cidr_class.MAX_MASK}-bit.")
+        self._ip_class = self.cidr_class.IP_CLASS
+        self._record = CIDRSnapshot._record_struct(self.cidr_class)
+        if len(self._map) != CIDRSnapshot.HEADER.size + count * self._record.size:
+            raise ValueError(f"{self.name}: CIDR snapshot is truncated or corrupt ({count} records expected).")
+        self.count = count
+        self.flags = flags
+        self._checksum = checksum
+        return
+
+    @staticmethod
+    def _record_struct(cidr_class):
+        """Record layout: base address and mask. 32-bit bases unpack straight to ints, wider ones as bytes."""
+        address_bytes = cidr_class.MAX_MASK // 8
+        return struct.Struct(">IB" if address_bytes == 4 else f">{address_bytes}sB")
+
+    @classmethod
+    def is_snapshot(cls, source):
+        """Determines if a filepath holds a snapshot, from its magic bytes."""
+        try:
+            with open(source, "rb") as f:
+                return f.read(len(cls.MAGIC)) == cls.MAGIC
+        except OSError:
+            return False
+
+    @classmethod
+    def write(cls, target, cidrs, checksum=True, cidr_class=None):
+        """
+        Writes CIDRs as a snapshot to a filepath or binary file object. Returns the # of records.
+
+        Records are sorted by first address then mask; bases are kept exactly as given.
+        cidr_class defaults to the class of the first CIDR (CIDR if there are none).
+        """
+        cidrs = sorted(cidrs, key=lambda cidr: (cidr.first_num, cidr.mask))
+        if cidr_class is None:
+            cidr_class = type(cidrs[0]) if cidrs else CIDR
+        for cidr in cidrs:
+            if cidr.MAX_MASK != cidr_class.MAX_MASK:
+                raise ValueError(f"{cidr}: can't write a {cidr.MAX_MASK}-bit CIDR to a {cidr_class.MAX_MASK}-bit snapshot.")
+        address_bytes = cidr_class.MAX_MASK // 8
+        record = struct.Struct(f">{address_bytes}sB")
+        records = b"".join(record.pack(cidr.base_ip.ip_num.to_bytes(address_bytes, "big"), cidr.mask) for cidr in cidrs)
+        flags = cls.FLAG_CHECKSUM if checksum else 0
+        header = cls.HEADER.pack(cls.MAGIC, cls.VERSION, cidr_class.MAX_MASK, flags, len(cidrs),
+                                 zlib.crc32(records) if checksum else 0)
+        if isinstance(target, str):
+            with open(target, "wb") as f:
+                f.write(header)
+                f.write(records)
+        else:
+            target.write(header)
+            target.write(records)
+        return len(cidrs)
+
+    def verify(self):
+        """Checks the CRC-32 of the records, if the snapshot has one. Raises ValueError on mismatch."""
+        if self.flags & CIDRSnapshot.FLAG_CHECKSUM:
+            if zlib.crc32(memoryview(self._map)[CIDRSnapshot.HEADER.size:]) != self._checksum:
+                raise ValueError(f"{self.name}: CIDR snapshot checksum mismatch.")
+        return
+
+    def _decode(self, base, mask):
+        """(base, mask) of an unpacked record."""
+        return (base if isinstance(base, int) else int.from_bytes(base, "big")), mask
+
+    def _at(self, i):
+        """(base, mask) of record i."""
+        return self._decode(*self._record.unpack_from(self._map, CIDRSnapshot.HEADER.size + i * self._record.size))
+
+    def _first(self, i):
+        """First address of record i."""
+        base, mask = self._at(i)
+        host_bits = self.cidr_class.MAX_MASK - mask
+        return (base >> host_bits) << host_bits
+
+    def _cidr(self, base, mask):
+        return self.cidr_class._new(self._ip_class._new(base), mask)
+
+    def _bisect(self, num):
+        """# of records whose first address is <= num."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._first(middle) <= num:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, ip):
+        """
+        CIDR record containing an IP (or numerical address), or None. O(log n).
+
+        Exact for records that don't overlap (EX. validated allocations): only the last record starting at or before the IP is checked.
+        """
+        num = ip if isinstance(ip, int) else ip.ip_num
+        i = self._bisect(num) - 1
+        if i >= 0:
+            cidr = self._cidr(*self._at(i))
+            if num <= cidr.last_num:
+                return cidr
+        return None
+
+    def __contains__(self, cidr):
+        """Whether a CIDR block (first address and mask) is one of the records. O(log n)."""
+        i = self._bisect(cidr.first_num) - 1
+        while i >= 0 and self._first(i) == cidr.first_num:
+            if self._at(i)[1] == cidr.mask:
+                return True
+            i -= 1
+        return False
+
+    def to_cidr_array(self):
+        """All records as a CIDRArray, decoded in one vectorized pass (requires numpy, IPv4 only)."""
+        if np is None:
+            raise ImportError("CIDRSnapshot.to_cidr_array requires numpy (pip install numpy).")
+        if self.cidr_class.MAX_MASK != CIDR.MAX_MASK:
+            raise ValueError(f"{self.name}: CIDRArray only holds IPv4 CIDRs.")
+        records = np.frombuffer(self._map, dtype=np.dtype([("base", ">u4"), ("mask", "u1")]),
+                                count=self.count, offset=CIDRSnapshot.HEADER.size)
+        return CIDRArray._from_arrays(records["base"].astype(np.uint32), records["mask"].copy())
+
+    def close(self):
+        """Unmaps the snapshot."""
+        self._map.close()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self):
+        """# of records."""
+        return self.count
+
+    def __getitem__(self, i):
+        """CIDR of record i."""
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("CIDR snapshot index out of range.")
+        return self._cidr(*self._at(i))
+
+    def __iter__(self):
+        """Yields every record as a CIDR, in order."""
+        records = memoryview(self._map)[CIDRSnapshot.HEADER.size:]
+        try:
+            cidr_new, ip_new = self.cidr_class._new, self._ip_class._new
+            for base, mask in self._record.iter_unpack(records):
+                if not isinstance(base, int):
+                    base = int.from_bytes(base, "big")
+                yield cidr_new(ip_new(base), mask)
+        finally:
+            records.release()
+        return
+
+    def __repr__(self):
+        """Debug representation."""
+        return f"{type(self).__name__}({self.name!r}, {self.count} records)"
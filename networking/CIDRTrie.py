@@ -0,0 +1,228 @@
+"""
+CIDRTrie.py
+
+Contains class definition.
+"""
+
+from networking import IPRange, CIDR, CIDRv6
+
+
+class _Node:
+    """Patricia trie node: a prefix (first address + mask) and, if stored, its CIDR."""
+    __slots__ = ("prefix", "mask", "cidr", "children")
+
+    def __init__(self, prefix, mask, cidr=None):
+        self.prefix = prefix
+        self.mask = mask
+        self.cidr = cidr
+        self.children = [None, None]
+
+
+class CIDRTrie:
+    """
+    Index of CIDR blocks as a binary radix (Patricia) tree.
+
+    Paths are compressed, so the trie holds at most 2n nodes, and every lookup
+    walks at most one node per mask bit: O(max_mask) whatever the number of blocks.
+    A trie holds one address family: max_mask 32 (CIDR, the default) or 128 (CIDRv6).
+    """
+
+    def __init__(self, cidrs=(), max_mask=CIDR.MAX_MASK):
+        """
+        Constructor: Creates a trie, optionally filled with CIDRs.
+        """
+        self.max_mask = max_mask
+        self._root = None
+        self._len = 0
+        for cidr in cidrs:
+            self.insert(cidr)
+        return
+
+    def _check(self, bits, item):
+        """Only addresses of the trie's family can be stored or looked up."""
+        if bits != self.max_mask:
+            raise ValueError(f"{item}: {bits}-bit address in a {self.max_mask}-bit CIDRTrie.")
+        return
+
+    def _bit(self, num, index):
+        """Bit of a numerical address at index (0 = most significant)."""
+        return (num >> (self.max_mask - 1 - index)) & 1
+
+    def _common(self, node, prefix, mask):
+        """Length of the prefix shared by a node and a (prefix, mask) key."""
+        diff = node.prefix ^ prefix
+        common = self.max_mask - diff.bit_length() if diff else self.max_mask
+        return min(common, node.mask, mask)
+
+    def insert(self, cidr):
+        """Adds a CIDR. Inserting an identical block replaces the stored CIDR."""
+        self._check(cidr.MAX_MASK, cidr)
+        prefix, mask = cidr.first_num, cidr.mask
+        parent, side, node = None, 0, self._root
+        while node is not None:
+            common = self._common(node, prefix, mask)
+            if common < node.mask:
+                # the key diverges from (or is a supernet of) this node: split the path
+                if common == mask:
+                    split = _Node(prefix, mask, cidr)
+                else:
+                    host_bits = self.max_mask - common
+                    split = _Node((prefix >> host_bits) << host_bits, common)
+                    split.children[self._bit(prefix, common)] = _Node(prefix, mask, cidr)
+                split.children[self._bit(node.prefix, common)] = node
+                self._attach(parent, side, split)
+                self._len += 1
+                return
+            if node.mask == mask:
+                if node.cidr is None:
+                    self._len += 1
+                node.cidr = cidr
+                return
+            parent, side = node, self._bit(prefix, node.mask)
+            node = node.children[side]
+        self._attach(parent, side, _Node(prefix, mask, cidr))
+        self._len += 1
+        return
+
+    def _attach(self, parent, side, node):
+        """Hangs a node under parent (or makes it the root)."""
+        if parent is None:
+            self._root = node
+        else:
+            parent.children[side] = node
+        return
+
+    def remove(self, cidr):
+        """Removes a CIDR. Raises KeyError if the block isn't stored."""
+        self._check(cidr.MAX_MASK, cidr)
+        prefix, mask = cidr.first_num, cidr.mask
+        path = [] # (parent, side) pairs leading to node
+        parent, side, node = None, 0, self._root
+        while node is not None and node.mask < mask:
+            if self._common(node, prefix, mask) < node.mask:
+                node = None
+                break
+            path.append((parent, side))
+            parent, side = node, self._bit(prefix, node.mask)
+            node = node.children[side]
+        if node is None or node.mask != mask or node.prefix != prefix or node.cidr is None:
+            raise KeyError(f"{cidr} is not in trie.")
+        node.cidr = None
+        self._len -= 1
+        # compress: drop nodes that no longer hold a CIDR or branch
+        while node is not None and node.cidr is None:
+            kids = [child for child in node.children if child is not None]
+            if len(kids) == 2:
+                break
+            self._attach(parent, side, kids[0] if kids else None)
+            if kids or not path:
+                break
+            # the parent lost a child, so it may have become redundant too
+            node = parent
+            parent, side = path.pop()
+        return
+
+    def _walk(self, prefix, mask):
+        """
+        Follows the path of a (prefix, mask) key (of the trie's family).
+
+        Returns the CIDRs stored on the path at or above the key (supernets, outermost first),
+        and the first node at or below the key, whose subtree holds its subnets (or None).
+        """
+        supernets = []
+        node = self._root
+        while node is not None:
+            if self._common(node, prefix, mask) < min(node.mask, mask):
+                return supernets, None
+            if node.mask >= mask:
+                # node is within the key
+                if node.mask == mask and node.cidr is not None:
+                    supernets.append(node.cidr)
+                return supernets, node
+            if node.cidr is not None:
+                supernets.append(node.cidr)
+            node = node.children[self._bit(prefix, node.mask)]
+        return supernets, None
+
+    @staticmethod
+    def _subtree(node):
+        """CIDRs stored under a node (inclusive), sorted by first address, then supernets first."""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.cidr is not None:
+                yield node.cidr
+            for child in reversed(node.children):
+                if child is not None:
+                    stack.append(child)
+
+    def longest_match(self, ip):
+        """Most specific stored CIDR that contains an IP, or None."""
+        self._check(ip.BITS, ip)
+        num = ip.ip_num
+        best = None
+        node = self._root
+        while node is not None:
+            host_bits = self.max_mask - node.mask
+            if (num >> host_bits) != (node.prefix >> host_bits):
+                break
+            if node.cidr is not None:
+                best = node.cidr
+            if node.mask == self.max_mask:
+                break
+            node = node.children[self._bit(num, node.mask)]
+        return best
+
+    def supernets(self, cidr):
+        """Stored CIDRs that contain a CIDR (including an identical block), outermost first."""
+        self._check(cidr.MAX_MASK, cidr)
+        return self._walk(cidr.first_num, cidr.mask)[0]
+
+    def subnets(self, cidr):
+        """Stored CIDRs within a CIDR (including an identical block), sorted."""
+        self._check(cidr.MAX_MASK, cidr)
+        _, node = self._walk(cidr.first_num, cidr.mask)
+        return list(self._subtree(node)) if node is not None else []
+
+    def overlaps(self, cidr):
+        """Stored CIDRs that overlap a CIDR: its supernets and subnets, sorted."""
+        self._check(cidr.MAX_MASK, cidr)
+        supernets, node = self._walk(cidr.first_num, cidr.mask)
+        subnets = list(self._subtree(node)) if node is not None else []
+        if supernets and subnets and supernets[-1] is subnets[0]:
+            # an identical block is both
+            supernets.pop()
+        return supernets + subnets
+
+    def is_free(self, other):
+        """
+        Determines if a CIDR (or IPRange) doesn't overlap any stored CIDR.
+
+        Every node of a Patricia trie either holds a CIDR or branches, so any
+        node found within the key means it is taken.
+        """
+        if isinstance(other, IPRange):
+            self._check(other.range[0].BITS, other)
+            cidr_class = CIDRv6 if self.max_mask == CIDRv6.MAX_MASK else CIDR
+            return all(self.is_free(cidr) for cidr in cidr_class.from_ip_range(other))
+        self._check(other.MAX_MASK, other)
+        supernets, node = self._walk(other.first_num, other.mask)
+        return not supernets and node is None
+
+    def __len__(self):
+        """# of stored CIDRs."""
+        return self._len
+
+    def __contains__(self, cidr):
+        """Whether an identical block is stored."""
+        supernets = self.supernets(cidr)
+        return bool(supernets) and supernets[-1].mask == cidr.mask
+
+    def __iter__(self):
+        """Stored CIDRs, sorted by first address, then supernets first."""
+        if self._root is not None:
+            yield from self._subtree(self._root)
+
+    def __repr__(self):
+        """Debug representation."""
+        return f"{type(self).__name__}({self._len} CIDRs)"
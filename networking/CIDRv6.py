@@ -0,0 +1,22 @@
+"""
+CIDRv6.py
+
+Contains class definition.
+"""
+
+from networking import IPv6, CIDR
+
+
+class CIDRv6(CIDR):
+    """
+    Represents an IPv6 CIDR Block.
+
+    Same integer core as CIDR, 128 bits wide: divide, from_ip_range, collapse,
+    range_blocks and the IPSet operations all work unchanged on /48 to /64 plans.
+    """
+    __slots__ = ()
+
+    MAX_MASK = 128
+    MIN_MASK = 0
+    IP_CLASS = IPv6
+    EXAMPLE = "2001:db8::/48"
@@ -4,18 +4,28 @@ IP.py
 Contains class definition.
 """
 
-import copy
-
 
 class IP:
-    """Represents an IPv4 address."""
+    """
+    Represents an IPv4 address.
+
+    The address is stored as a single 32-bit integer (ip_num). Instances are
+    immutable, so they can be shared freely, hashed, and never need copying.
+    Octets and strings are only computed when asked for.
+    """
+    __slots__ = ("ip_num",)
+
     OCTETS = 4
     BITS_PER_OCTET = 8
-    
+    BITS = OCTETS * BITS_PER_OCTET
+
     OCTET_RANGE = 256
     MAX_OCTET_NUM = 255
     MIN_OCTET_NUM = 0
 
+    MAX_NUM = 2**BITS - 1
+    MIN_NUM = 0
+
     OCTET_POWERS = [
         1, # 256**0
         256, # 256**1
@@ -25,8 +35,8 @@ class IP:
 
     def __init__(self, *, ip_string=None, ip_list=None):
         """
-        Constructor: Converts IP string into octet list.
-        
+        Constructor: Converts IP string or octet list into its numerical representation.
+
         (1) Create an IP given a string (EX) 10.0.0.0
 
         or
@@ -36,7 +46,7 @@ class IP:
         if type(ip_string) == str:
             try:
                 # each octet must be parse-able as an integer
-                self.ip = [int(ip) for ip in ip_string.split(".")]
+                octets = [int(ip) for ip in ip_string.split(".")]
             except:
                 # propagate error to client
                 raise ValueError(f"{ip_string}: incorrect ip_string input to IP: " +
@@ -46,74 +56,115 @@ class IP:
                 if not type(ip) == int:
                     raise ValueError(f"{ip_list}: incorrect ip_list input to IP: " +
                         "Must be a list of numbers (EX: [10, 0, 0, 0])")
-            # avoid any issues with references
-            self.ip = copy.deepcopy(ip_list)
+            octets = ip_list
         else:
             raise ValueError("IP input must be either (string) ip_string (EX: 10.0.0.0) or " +
                 "(list) ip_list (EX. [10,0,0,0])")
         # validate IP
-        self._validate()
-        # if valid, creates a numerical representation of IP
-        self.ip_num = self._to_numerical()
+        IP._validate(octets)
+        # if valid, the numerical representation becomes the source of truth
+        object.__setattr__(self, "ip_num", IP._to_numerical(octets))
         return
 
-    def _validate(self):
-        """Validates IP."""
-        if len(self.ip) != IP.OCTETS:
-            raise ValueError(f"{self}: octet count must be {IP.OCTETS}. EX: 255.255.255.255")
-        if self.ip[0] == 0:
-            raise ValueError(f"{self}: first octet cannot be 0 as it is reserved.")
-        for octet in self.ip:
+    @classmethod
+    def from_int(cls, num):
+        """Create an IP given its numerical representation (# of hosts between IP and 0.0.0.0)."""
+        if type(num) != int or num < cls.MIN_NUM or num > cls.MAX_NUM:
+            raise ValueError(f"{num}: numerical IP must be an integer <= {cls.MAX_NUM} and >= {cls.MIN_NUM}.")
+        return cls._new(num)
+
+    @classmethod
+    def _new(cls, num):
+        """Create an IP from a trusted numerical representation, skipping validation."""
+        ip = cls.__new__(cls)
+        object.__setattr__(ip, "ip_num", num)
+        return ip
+
+    @staticmethod
+    def _validate(octets):
+        """Validates an octet list."""
+        if len(octets) != IP.OCTETS:
+            raise ValueError(f"{IP._join(octets)}: octet count must be {IP.OCTETS}. EX: 255.255.255.255")
+        if octets[0] == 0:
+            raise ValueError(f"{IP._join(octets)}: first octet cannot be 0 as it is reserved.")
+        for octet in octets:
             if octet < IP.MIN_OCTET_NUM or octet > IP.MAX_OCTET_NUM:
-                raise ValueError(f"{self}: octets must be integers <= {IP.MAX_OCTET_NUM} " + 
+                raise ValueError(f"{IP._join(octets)}: octets must be integers <= {IP.MAX_OCTET_NUM} " +
                                  f"and >= {IP.MIN_OCTET_NUM}. EX: 255.125.221.0")
         return
 
-    def _to_numerical(self):
+    @staticmethod
+    def _join(octets):
+        """Octet list to dotted string (used for error messages)."""
+        return ".".join([str(octet) for octet in octets])
+
+    @staticmethod
+    def _to_numerical(octets):
         """# of hosts between IP and 0.0.0.0"""
-        total = 0
-        for i in range(len(self.ip)):
-            # OCTET_POWERS[i] = 256**[i] pre-calculated
-            # essentially converts IP bits into an integer one octet at a time (i)
-            # as the octet becomes more "significant", it increases addresses by
-            # a magnitude of 256 (IP.OCTET_RANGE)
-            total += self.ip[i] * IP.OCTET_POWERS[abs(i - IP.OCTETS + 1)]
-        return total
-
-    def _from_numerical(self, num):
+        # essentially converts IP bits into an integer one octet at a time:
+        # as the octet becomes more "significant", it is shifted further left
+        return (octets[0] << 24) | (octets[1] << 16) | (octets[2] << 8) | octets[3]
+
+    @staticmethod
+    def _from_numerical(num):
         """
-        From # of hosts between IP and 0.0.0.0 to an IP address.
+        From # of hosts between IP and 0.0.0.0 to an IP address (octet list).
         """
-        ip = []
-        left = num
-        for i in range(len(self.ip)):
-            # OCTET_POWERS[i] = 256**[i] pre-calculated
-            # uses the fact that a more "significant" octet increases
-            # addresses by a magnitude of 256 (IP.OCTET_RANGE) at a time
-            octet_val = IP.OCTET_POWERS[abs(i - IP.OCTETS + 1)]
-            ip.append(left // octet_val)
-            left -= (ip[-1] * octet_val)
-        return ip
+        return [(num >> 24) & 0xFF, (num >> 16) & 0xFF, (num >> 8) & 0xFF, num & 0xFF]
+
+    @property
+    def ip(self):
+        """Octet list (EX) [10, 0, 0, 0], computed on demand."""
+        return self._from_numerical(self.ip_num)
 
     def add_hosts(self, hosts):
-        """Increase the IP address by # hosts."""
-        self.ip_num += hosts
-        self.ip = self._from_numerical(self.ip_num)
-        return self
+        """Returns the IP address increased by # hosts."""
+        return self._new(self.ip_num + hosts)
 
     def remove_hosts(self, hosts):
-        """Decrease the IP address by # hosts."""
-        self.ip_num -= hosts
-        self.ip = self._from_numerical(self.ip_num)
-        return self
+        """Returns the IP address decreased by # hosts."""
+        return self._new(self.ip_num - hosts)
 
     def is_adjacent(self, other):
         """If IP address is adjacent to another IP address."""
         return abs(self.ip_num - other.ip_num) == 1
 
+    def __setattr__(self, name, value):
+        """IPs are immutable."""
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __delattr__(self, name):
+        """IPs are immutable."""
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __copy__(self):
+        """Immutable, so copies are unnecessary."""
+        return self
+
+    def __deepcopy__(self, memo):
+        """Immutable, so copies are unnecessary."""
+        return self
+
+    def __reduce__(self):
+        """Pickle support (slots + immutability bypass the default protocol)."""
+        return (type(self)._new, (self.ip_num,))
+
     def __str__(self):
         """String representation."""
-        return ".".join([str(ip) for ip in self.ip])
+        num = self.ip_num
+        return f"{num >> 24}.{(num >> 16) & 0xFF}.{(num >> 8) & 0xFF}.{num & 0xFF}"
+
+    def __repr__(self):
+        """Debug representation."""
+        return f"{type(self).__name__}('{self}')"
+
+    def __int__(self):
+        """Numerical representation."""
+        return self.ip_num
+
+    def __hash__(self):
+        """Hash on the numerical representation."""
+        return hash(self.ip_num)
 
     def __sub__(self, other):
         """
@@ -123,36 +174,32 @@ class IP:
         return abs(self.ip_num - other.ip_num) + 1
 
     def __eq__(self, other):
-        """== comparator."""
-        for i, ip in enumerate(self.ip):
-            if ip != other.ip[i]:
-                return False
-        return True
+        """== comparator: same address family and number."""
+        if not isinstance(other, IP):
+            return NotImplemented
+        return self.ip_num == other.ip_num and self.BITS == other.BITS
 
     def __ne__(self, other):
         """!= comparator."""
-        return not self.__eq__(other)
+        if not isinstance(other, IP):
+            return NotImplemented
+        return self.ip_num != other.ip_num or self.BITS != other.BITS
 
     def __lt__(self, other):
         """< comparator."""
-        for i, ip in enumerate(self.ip):
-            if ip < other.ip[i]:
-                return True
-            if ip > other.ip[i]:
-                return False
-        return False
+        return self.ip_num < other.ip_num
 
     def __le__(self, other):
         """<= comparator."""
-        return self.__eq__(other) or self.__lt__(other)
+        return self.ip_num <= other.ip_num
 
     def __gt__(self, other):
         """> comparator."""
-        return not self.__le__(other)
+        return self.ip_num > other.ip_num
 
     def __ge__(self, other):
         """>= comparator."""
-        return not self.__lt__(other)
+        return self.ip_num >= other.ip_num
 
     def __getitem__(self, index):
         """[] override."""
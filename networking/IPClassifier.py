@@ -0,0 +1,190 @@
+"""
+IPClassifier.py
+
+Contains class definition.
+"""
+
+import bisect
+import warnings
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, and only needed for the *_array/*_strings batch methods
+    np = None
+
+from networking import IP, CIDRArray
+
+
+class IPClassifier:
+    """
+    Labels IP addresses with the allocated CIDR they fall in.
+
+    The CIDRs are flattened once into sorted, disjoint address segments, each
+    labeled with its most specific CIDR, so each lookup is a binary search
+    (bisect, or NumPy searchsorted for whole batches) instead of an is_within
+    call per CIDR.
+    """
+    UNALLOCATED = "unallocated"
+    INVALID = "invalid"
+    # IP strings are classified by one rule everywhere (see parse_ip): 4 octets of 1 to 3 ASCII digits, <= 255.
+    # unlike IP, 0.x.x.x is accepted: flow logs carry addresses such as 0.0.0.0
+    IP_STRING_ERROR = f"incorrect IP string: must be 4 integer octets <= {IP.MAX_OCTET_NUM} " + \
+        f"and >= {IP.MIN_OCTET_NUM}. EX: 255.125.221.0"
+
+    def __init__(self, cidrs):
+        """
+        Constructor: Indexes CIDRs. Nested CIDRs are allowed; the most specific one wins.
+        """
+        self.cidrs = sorted(cidrs, key=lambda cidr: (cidr.first_num, cidr.mask))
+        for cidr in self.cidrs:
+            if cidr.MAX_MASK != IP.BITS:
+                raise ValueError(f"{cidr}: IPClassifier only indexes IPv4 CIDRs.")
+        # segments: starts[i]..ends[i] are labeled with self.cidrs[labels[i]]
+        self.starts, self.ends, self.labels = [], [], []
+        # sweep: stack of the CIDRs open at the current address (pos), innermost last
+        stack = []
+        pos = None
+        for index, cidr in enumerate(self.cidrs):
+            while stack and self.cidrs[stack[-1]].last_num < cidr.first_num:
+                pos = self._close(stack.pop(), pos)
+            if stack and pos < cidr.first_num:
+                self._emit(pos, cidr.first_num - 1, stack[-1])
+            pos = cidr.first_num
+            stack.append(index)
+        while stack:
+            pos = self._close(stack.pop(), pos)
+        self._arrays = None
+        return
+
+    def _emit(self, first_num, last_num, label):
+        """Appends a labeled segment."""
+        self.starts.append(first_num)
+        self.ends.append(last_num)
+        self.labels.append(label)
+        return
+
+    def _close(self, label, pos):
+        """Emits what is left of a closing CIDR from pos on. Returns the next position."""
+        last_num = self.cidrs[label].last_num
+        if pos <= last_num:
+            self._emit(pos, last_num, label)
+        return last_num + 1
+
+    def index(self, num):
+        """Index (into cidrs) of the most specific CIDR containing a numerical address, or -1."""
+        i = bisect.bisect_right(self.starts, num) - 1
+        return self.labels[i] if i >= 0 and num <= self.ends[i] else -1
+
+    def classify(self, ip):
+        """Most specific CIDR containing an IP (IP, IP string or numerical address), or None."""
+        if isinstance(ip, str):
+            num = IPClassifier.parse_ip(ip)
+            if num is None:
+                raise ValueError(f"{ip}: {IPClassifier.IP_STRING_ERROR}")
+            ip = num
+        i = self.index(ip if isinstance(ip, int) else ip.ip_num)
+        return self.cidrs[i] if i >= 0 else None
+
+    def classify_many(self, ips):
+        """Generates the classification (CIDR or None) of each IP in an iterable (see classify)."""
+        for ip in ips:
+            yield self.classify(ip)
+
+    def _numpy_arrays(self):
+        """
+        Partition of the whole address space for searchsorted, built on first use.
+
+        bounds[i] is the first address of partition i, labels[i] its CIDR index (-1 for unallocated gaps),
+        so a lookup is a single searchsorted plus a gather.
+        """
+        if np is None:
+            raise ImportError("Batch classification requires numpy (pip install numpy).")
+        if self._arrays is None:
+            bounds, labels = [], []
+            pos = 0
+            for first_num, last_num, label in zip(self.starts, self.ends, self.labels):
+                if first_num > pos:
+                    bounds.append(pos)
+                    labels.append(-1)
+                bounds.append(first_num)
+                labels.append(label)
+                pos = last_num + 1
+            if pos <= IP.MAX_NUM:
+                bounds.append(pos)
+                labels.append(-1)
+            self._arrays = (np.asarray(bounds, dtype=np.uint32), np.asarray(labels, dtype=np.int64))
+        return self._arrays
+
+    def classify_array(self, nums):
+        """
+        Vectorized classification of numerical addresses (EX. a uint32 array).
+
+        Returns an int64 array of indices into cidrs, -1 for unallocated addresses.
+        """
+        bounds, labels = self._numpy_arrays()
+        nums = np.asarray(nums)
+        if nums.dtype != bounds.dtype:
+            nums = nums.astype(bounds.dtype)
+        return labels[np.searchsorted(bounds, nums, side="right") - 1]
+
+    @staticmethod
+    def parse_ips(ip_strings):
+        """Parses IP strings (EX. 10.0.0.1) into a uint32 array in one batch. Raises ValueError on malformed input."""
+        if np is None:
+            raise ImportError("Batch classification requires numpy (pip install numpy).")
+        lines = [s.strip() for s in ip_strings]
+        if not lines:
+            return np.empty(0, dtype=np.uint32)
+        # every line must have the octet shape on its own, or tokens of neighbouring lines could pair up wrongly
+        malformed = CIDRArray._malformed(lines, "." * (IP.OCTETS - 1))
+        if malformed.any():
+            line = lines[int(np.argmax(malformed))]
+            raise ValueError(f"{line}: {IPClassifier.IP_STRING_ERROR}")
+        text = "\n".join(lines)
+        with warnings.catch_warnings():
+            # unparseable input truncates the result (and warns) in older numpy versions
+            warnings.simplefilter("ignore", DeprecationWarning)
+            try:
+                values = np.fromstring(text.replace(".", " "), dtype=np.int64, sep=" ")
+            except ValueError:
+                values = np.empty(0, dtype=np.int64)
+        octets = values.reshape(-1, IP.OCTETS) if len(values) == len(lines) * IP.OCTETS else None
+        valid = None
+        if octets is not None:
+            valid = ((octets >= IP.MIN_OCTET_NUM) & (octets <= IP.MAX_OCTET_NUM)).all(axis=1)
+        if octets is None:
+            raise ValueError("IP strings could not be parsed.")
+        if not valid.all():
+            line = lines[int(np.argmin(valid))]
+            raise ValueError(f"{line}: {IPClassifier.IP_STRING_ERROR}")
+        return ((octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]).astype(np.uint32)
+
+    @staticmethod
+    def parse_ip(ip_string):
+        """Numerical address of an IP string, by the same rule as parse_ips (0.x.x.x allowed), or None if malformed."""
+        octets = ip_string.strip().split(".")
+        if len(octets) != IP.OCTETS:
+            return None
+        num = 0
+        for octet in octets:
+            if not 1 <= len(octet) <= 3 or not octet.isascii() or not octet.isdigit() or int(octet) > IP.MAX_OCTET_NUM:
+                return None
+            num = (num << IP.BITS_PER_OCTET) | int(octet)
+        return num
+
+    @staticmethod
+    def is_ip_string(ip_string):
+        """Whether parse_ips (and parse_ip) accept an IP string."""
+        return IPClassifier.parse_ip(ip_string) is not None
+
+    def classify_strings(self, ip_strings):
+        """Vectorized classification of IP strings. Returns an index array as classify_array."""
+        return self.classify_array(self.parse_ips(ip_strings))
+
+    def __len__(self):
+        """# of indexed CIDRs."""
+        return len(self.cidrs)
+
+    def __repr__(self):
+        """Debug representation."""
+        return f"{type(self).__name__}({len(self.cidrs)} CIDRs, {len(self.starts)} segments)"
@@ -4,13 +4,16 @@ IPRange.py
 Contains class definition.
 """
 
-import copy
-
 from networking import IP
 
 
 class IPRange:
-    """Represents a range of IPv4 addresses."""
+    """
+    Represents a range of IPv4 addresses.
+
+    Instances are immutable: range is a (first IP, last IP) tuple.
+    """
+    __slots__ = ("range", "hosts")
 
     def __init__(self, *, first_ip=None, second_ip=None, cidr=None):
         """
@@ -30,41 +33,39 @@ class IPRange:
         if cidr is not None:
             try:
                 base_ip = cidr.base_ip
-                mask = cidr.mask
-                hosts = cidr.hosts
-
-                # for each octet in an IP address
-                primary_ip_octets = []
-                secondary_ip_octets = []
-                for i in range(IP.OCTETS):
-                    # for each octet, grab <= 8 bits (# bits per octet) from mask to use
-                    bits = IP.BITS_PER_OCTET if mask >= IP.BITS_PER_OCTET else mask
-                    mask -= bits
-                    # bitwise ^ (xor) to calculate netmask segment
-                    netmask_octet = IP.MAX_OCTET_NUM ^ ((2**(IP.BITS_PER_OCTET-bits)) - 1)
-                    # ip segment bitwise & (and) with netmask segment to calculate primary IP
-                    ip_octet = netmask_octet & base_ip[i]
-                    primary_ip_octets.append(ip_octet)
-                    secondary_ip_octets.append(ip_octet)
-
-                first_ip = IP(ip_list=primary_ip_octets)
-                second_ip = IP(ip_list=secondary_ip_octets).add_hosts(cidr.hosts - 1)
+                ip_class = type(base_ip)
+                # netmask: mask bits set from the most significant bit down
+                host_bits = ip_class.BITS - cidr.mask
+                netmask = ip_class.MAX_NUM ^ ((1 << host_bits) - 1)
+                # ip bitwise & (and) with netmask to calculate primary IP
+                first_num = base_ip.ip_num & netmask
+                first_ip = ip_class._new(first_num)
+                second_ip = ip_class._new(first_num + (1 << host_bits) - 1)
                 # now, gets evaluated by next "if" statement and gets placed into self.range
             except Exception as e:
                 raise ValueError(f"({e}) Incorrect CIDR input to IPRange. Must be a valid instance of type CIDR.")
-        if isinstance(first_ip, IP) and isinstance(second_ip, IP):
-            # IPRange must be sorted at all times
+        if isinstance(first_ip, IP) and isinstance(second_ip, IP) and first_ip.BITS == second_ip.BITS:
+            # IPRange must be sorted at all times. IPs are immutable, so no copies are needed.
             if first_ip < second_ip:
-                self.range = [copy.deepcopy(first_ip), copy.deepcopy(second_ip)]
+                ipr = (first_ip, second_ip)
             else:
-                self.range = [copy.deepcopy(second_ip), copy.deepcopy(first_ip)]
+                ipr = (second_ip, first_ip)
         else:
             raise ValueError("Incorrect IPRange inputs: " +
-                "Either pass in first_ip, second_ip of type IP or cidr of type CIDR.")
+                "Either pass in first_ip, second_ip of type IP (of the same family) or cidr of type CIDR.")
+        object.__setattr__(self, "range", ipr)
         # determine # of hosts (inclusive start/end IPs)
-        self.hosts = self.range[1] - self.range[0]
+        object.__setattr__(self, "hosts", ipr[1] - ipr[0])
         return
 
+    @classmethod
+    def _from_ints(cls, first_num, last_num, ip_class=IP):
+        """Create an IPRange from trusted, sorted numerical endpoints, skipping validation."""
+        ipr = cls.__new__(cls)
+        object.__setattr__(ipr, "range", (ip_class._new(first_num), ip_class._new(last_num)))
+        object.__setattr__(ipr, "hosts", last_num - first_num + 1)
+        return ipr
+
     def is_within(self, other):
         """Determines if current IPRange is within other IPRange."""
         return self.range[1] <= other.range[1] if self.range[0] >= other.range[0] else False
@@ -77,10 +78,45 @@ class IPRange:
         # external
         return not (self.range[1] < other.range[0] or self.range[0] > other.range[1])
 
+    def __setattr__(self, name, value):
+        """IPRanges are immutable."""
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __delattr__(self, name):
+        """IPRanges are immutable."""
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __copy__(self):
+        """Immutable, so copies are unnecessary."""
+        return self
+
+    def __deepcopy__(self, memo):
+        """Immutable, so copies are unnecessary."""
+        return self
+
+    def __reduce__(self):
+        """Pickle support (slots + immutability bypass the default protocol)."""
+        first_ip, second_ip = self.range
+        return (type(self)._from_ints, (first_ip.ip_num, second_ip.ip_num, type(first_ip)))
+
     def __str__(self):
         """String representation."""
         return "{} to {}".format(self.range[0], self.range[1])
 
+    def __repr__(self):
+        """Debug representation."""
+        return f"{type(self).__name__}('{self}')"
+
+    def __hash__(self):
+        """Hash on the endpoints."""
+        return hash(self.range)
+
+    def __eq__(self, other):
+        """== comparator."""
+        if not isinstance(other, IPRange):
+            return NotImplemented
+        return self.range == other.range
+
     def __lt__(self, other):
         """< comparator. Assuming the IPRanges don't overlap."""
         return self.range[1] < other.range[0]
@@ -0,0 +1,301 @@
+"""
+IPSet.py
+
+Contains class definition.
+"""
+
+import bisect
+import heapq
+
+from networking import IP, IPRange, CIDR
+
+
+class IPSet:
+    """
+    Represents an arbitrary set of addresses of one family (IPv4 by default, or cidr_class=CIDRv6).
+
+    Stored as sorted, disjoint, non-adjacent (first, last) numerical intervals,
+    so union, intersection and difference are linear merges, membership is a
+    binary search, and conversion back to CIDRs is the minimal decomposition.
+    """
+    __slots__ = ("_starts", "_ends", "cidr_class")
+
+    def __init__(self, items=(), cidr_class=CIDR):
+        """
+        Constructor: Creates a set from CIDRs, IPRanges, IPs, or CIDR strings. Runs in O(n log n).
+        """
+        self.cidr_class = cidr_class
+        self._starts, self._ends = [], []
+        self._coalesce(sorted(self._interval(item) for item in items))
+        return
+
+    @classmethod
+    def _from_intervals(cls, starts, ends, cidr_class=CIDR):
+        """Create an IPSet from trusted sorted, disjoint, non-adjacent intervals."""
+        ip_set = cls.__new__(cls)
+        ip_set.cidr_class = cidr_class
+        ip_set._starts = starts
+        ip_set._ends = ends
+        return ip_set
+
+    def _interval(self, item):
+        """(first, last) numerical addresses of a CIDR, IPRange, IP, or CIDR string of the set's family."""
+        if isinstance(item, str):
+            item = self.cidr_class(cidr_string=item)
+        if isinstance(item, CIDR):
+            bits, interval = item.MAX_MASK, (item.first_num, item.last_num)
+        elif isinstance(item, IPRange):
+            bits, interval = item.range[0].BITS, (item.range[0].ip_num, item.range[1].ip_num)
+        elif isinstance(item, IP):
+            bits, interval = item.BITS, (item.ip_num, item.ip_num)
+        else:
+            raise ValueError(f"{item}: IPSet items must be CIDRs, IPRanges, IPs, or CIDR strings.")
+        if bits != self.cidr_class.MAX_MASK:
+            raise ValueError(f"{item}: {bits}-bit address in a {self.cidr_class.MAX_MASK}-bit IPSet.")
+        return interval
+
+    def _coalesce(self, intervals):
+        """Appends sorted intervals, merging overlapping and adjacent ones."""
+        starts, ends = self._starts, self._ends
+        for first_num, last_num in intervals:
+            if ends and first_num <= ends[-1] + 1:
+                if last_num > ends[-1]:
+                    ends[-1] = last_num
+            else:
+                starts.append(first_num)
+                ends.append(last_num)
+        return
+
+    def _same_kind(self, starts, ends):
+        return IPSet._from_intervals(starts, ends, self.cidr_class)
+
+    def _check_kind(self, other):
+        """Sets of different address families can't be combined."""
+        if self.cidr_class.MAX_MASK != other.cidr_class.MAX_MASK:
+            raise ValueError(f"Can't combine a {self.cidr_class.MAX_MASK}-bit IPSet with a " +
+                             f"{other.cidr_class.MAX_MASK}-bit IPSet.")
+        return
+
+    def intervals(self):
+        """Sorted, disjoint (first, last) numerical intervals."""
+        return list(zip(self._starts, self._ends))
+
+    def ranges(self):
+        """Sorted, disjoint IPRanges."""
+        ip_class = self.cidr_class.IP_CLASS
+        return [IPRange._from_ints(first_num, last_num, ip_class) for first_num, last_num in zip(self._starts, self._ends)]
+
+    def iter_cidrs(self):
+        """Generates the minimal list of CIDRs covering the set, in order."""
+        cidr_class = self.cidr_class
+        ip_class = cidr_class.IP_CLASS
+        for first_num, last_num in zip(self._starts, self._ends):
+            for base, mask in cidr_class.range_blocks(first_num, last_num):
+                yield cidr_class._new(ip_class._new(base), mask)
+
+    def cidrs(self):
+        """Minimal list of CIDRs covering the set, in order."""
+        return list(self.iter_cidrs())
+
+    @property
+    def size(self):
+        """# of addresses in the set."""
+        return sum(self._ends) - sum(self._starts) + len(self._starts)
+
+    def add(self, item):
+        """
+        Adds a CIDR, IPRange, IP, or CIDR string in place, merging it with overlapping and adjacent intervals.
+
+        Found by binary search. Returns (removed, added) lists of the intervals that changed.
+        """
+        first_num, last_num = self._interval(item)
+        starts, ends = self._starts, self._ends
+        # intervals that overlap or touch [first_num, last_num] are starts[i:j]
+        i = bisect.bisect_left(ends, first_num - 1)
+        j = bisect.bisect_right(starts, last_num + 1)
+        removed = list(zip(starts[i:j], ends[i:j]))
+        if removed:
+            first_num = min(first_num, starts[i])
+            last_num = max(last_num, ends[j - 1])
+        starts[i:j] = [first_num]
+        ends[i:j] = [last_num]
+        return removed, [(first_num, last_num)]
+
+    def discard(self, item):
+        """
+        Removes a CIDR, IPRange, IP, or CIDR string in place, splitting the intervals it overlaps.
+
+        Found by binary search. Returns (removed, added) lists of the intervals that changed.
+        """
+        first_num, last_num = self._interval(item)
+        starts, ends = self._starts, self._ends
+        # intervals that overlap [first_num, last_num] are starts[i:j]
+        i = bisect.bisect_left(ends, first_num)
+        j = bisect.bisect_right(starts, last_num)
+        if i >= j:
+            return [], []
+        removed = list(zip(starts[i:j], ends[i:j]))
+        added = []
+        if starts[i] < first_num:
+            added.append((starts[i], first_num - 1))
+        if ends[j - 1] > last_num:
+            added.append((last_num + 1, ends[j - 1]))
+        starts[i:j] = [first for first, _ in added]
+        ends[i:j] = [last for _, last in added]
+        return removed, added
+
+    def mask_counts(self):
+        """# of blocks of each mask (index) in the minimal CIDR list, without building CIDRs. O(n * MAX_MASK)."""
+        cidr_class = self.cidr_class
+        counts = [0] * (cidr_class.MAX_MASK + 1)
+        for first_num, last_num in zip(self._starts, self._ends):
+            for _, mask in cidr_class.range_blocks(first_num, last_num):
+                counts[mask] += 1
+        return counts
+
+    def capacity(self):
+        """
+        # of aligned blocks of each mask (index) that fit in the set.
+
+        Aligned blocks never straddle blocks of the minimal CIDR list, so a block of mask m
+        holds 2 ** (mask - m) blocks of every mask >= m.
+        """
+        return IPSet._capacity(self.mask_counts())
+
+    @staticmethod
+    def _capacity(counts):
+        """Aligned blocks of each mask, given the mask counts of a minimal CIDR list (see capacity)."""
+        capacity = [0] * len(counts)
+        for mask, count in enumerate(counts):
+            if count:
+                for target_mask in range(mask, len(counts)):
+                    capacity[target_mask] += count << (target_mask - mask)
+        return capacity
+
+    def largest_interval(self):
+        """Largest contiguous (first, last) numerical interval (the lowest one on ties), or None if empty."""
+        if not self._starts:
+            return None
+        i = max(range(len(self._starts)), key=lambda i: (self._ends[i] - self._starts[i], -i))
+        return self._starts[i], self._ends[i]
+
+    def largest_cidr(self):
+        """Largest aligned CIDR in the set (the lowest one on ties), or None if empty."""
+        best = None
+        for first_num, last_num in zip(self._starts, self._ends):
+            for base, mask in self.cidr_class.range_blocks(first_num, last_num):
+                if best is None or mask < best[1]:
+                    best = (base, mask)
+        if best is None:
+            return None
+        return self.cidr_class._new(self.cidr_class.IP_CLASS._new(best[0]), best[1])
+
+    def fragmentation(self):
+        """1 - (largest contiguous interval / size): 0 when all addresses are contiguous (or the set is empty)."""
+        largest = self.largest_interval()
+        if largest is None:
+            return 0.0
+        return 1 - (largest[1] - largest[0] + 1) / self.size
+
+    def union(self, other):
+        """Addresses in either set. O(n + m)."""
+        self._check_kind(other)
+        result = self._same_kind([], [])
+        result._coalesce(heapq.merge(zip(self._starts, self._ends), zip(other._starts, other._ends)))
+        return result
+
+    def intersection(self, other):
+        """Addresses in both sets. O(n + m)."""
+        self._check_kind(other)
+        starts, ends = [], []
+        a_starts, a_ends, b_starts, b_ends = self._starts, self._ends, other._starts, other._ends
+        i = j = 0
+        while i < len(a_starts) and j < len(b_starts):
+            first_num = max(a_starts[i], b_starts[j])
+            last_num = min(a_ends[i], b_ends[j])
+            if first_num <= last_num:
+                starts.append(first_num)
+                ends.append(last_num)
+            # move past whichever interval ends first
+            if a_ends[i] < b_ends[j]:
+                i += 1
+            else:
+                j += 1
+        return self._same_kind(starts, ends)
+
+    def difference(self, other):
+        """Addresses in this set but not the other. O(n + m)."""
+        self._check_kind(other)
+        starts, ends = [], []
+        b_starts, b_ends = other._starts, other._ends
+        j = 0
+        for first_num, last_num in zip(self._starts, self._ends):
+            # skip removed intervals entirely before this one
+            while j < len(b_starts) and b_ends[j] < first_num:
+                j += 1
+            current = first_num
+            k = j
+            # carve out every removed interval that starts within this one
+            while k < len(b_starts) and b_starts[k] <= last_num:
+                if b_starts[k] > current:
+                    starts.append(current)
+                    ends.append(b_starts[k] - 1)
+                current = max(current, b_ends[k] + 1)
+                k += 1
+            if current <= last_num:
+                starts.append(current)
+                ends.append(last_num)
+        return self._same_kind(starts, ends)
+
+    def symmetric_difference(self, other):
+        """Addresses in exactly one of the sets. O(n + m)."""
+        return self.difference(other).union(other.difference(self))
+
+    def complement(self, cidr):
+        """Addresses of a CIDR (EX. the network) not in the set."""
+        return IPSet([cidr], self.cidr_class).difference(self)
+
+    def contains(self, item):
+        """Whether a CIDR, IPRange, IP, or CIDR string is entirely within the set. O(log n)."""
+        first_num, last_num = self._interval(item)
+        i = bisect.bisect_right(self._starts, first_num) - 1
+        return i >= 0 and last_num <= self._ends[i]
+
+    def isdisjoint(self, other):
+        """Whether the sets share no address."""
+        return not self.intersection(other)
+
+    def issubset(self, other):
+        """Whether every address of this set is in the other."""
+        return not self.difference(other)
+
+    def issuperset(self, other):
+        """Whether every address of the other set is in this one."""
+        return other.issubset(self)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+    __xor__ = symmetric_difference
+    __contains__ = contains
+    __le__ = issubset
+    __ge__ = issuperset
+
+    def __bool__(self):
+        """Whether the set holds any address."""
+        return bool(self._starts)
+
+    def __eq__(self, other):
+        """== comparator: same address family and addresses."""
+        if not isinstance(other, IPSet):
+            return NotImplemented
+        return self.cidr_class.MAX_MASK == other.cidr_class.MAX_MASK and \
+            self._starts == other._starts and self._ends == other._ends
+
+    def __str__(self):
+        """String representation: the minimal CIDRs."""
+        return ", ".join(str(cidr) for cidr in self.iter_cidrs())
+
+    def __repr__(self):
+        """Debug representation."""
+        return f"{type(self).__name__}({len(self._starts)} ranges, {self.size} addresses)"
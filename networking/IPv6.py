@@ -0,0 +1,136 @@
+"""
+IPv6.py
+
+Contains class definition.
+"""
+
+from networking import IP
+
+
+class IPv6(IP):
+    """
+    Represents an IPv6 address.
+
+    Same integer core as IP, 128 bits wide: the address is a single ip_num, and
+    the 8 16-bit groups and the string (RFC 5952: lowercase, zeros compressed)
+    are only computed when asked for.
+    """
+    __slots__ = ()
+
+    GROUPS = 8
+    BITS_PER_GROUP = 16
+    BITS = GROUPS * BITS_PER_GROUP
+
+    MAX_GROUP_NUM = 0xFFFF
+    MIN_GROUP_NUM = 0
+
+    MAX_NUM = 2**BITS - 1
+    MIN_NUM = 0
+
+    def __init__(self, *, ip_string=None, ip_list=None):
+        """
+        Constructor: Converts IPv6 string or group list into its numerical representation.
+
+        (1) Create an IPv6 given a string (EX) 2001:db8::1
+
+        or
+
+        (2) Create an IPv6 given a list of 8 groups (EX) [0x2001, 0xdb8, 0, 0, 0, 0, 0, 1]
+        """
+        if type(ip_string) == str:
+            groups = IPv6._parse(ip_string)
+        elif type(ip_list) == list:
+            for group in ip_list:
+                if not type(group) == int:
+                    raise ValueError(f"{ip_list}: incorrect ip_list input to IPv6: " +
+                        "Must be a list of 8 numbers (EX: [0x2001, 0xdb8, 0, 0, 0, 0, 0, 1])")
+            groups = ip_list
+        else:
+            raise ValueError("IPv6 input must be either (string) ip_string (EX: 2001:db8::1) or " +
+                "(list) ip_list (EX. [0x2001, 0xdb8, 0, 0, 0, 0, 0, 1])")
+        # validate IP
+        IPv6._validate(groups)
+        # if valid, the numerical representation becomes the source of truth
+        object.__setattr__(self, "ip_num", IPv6._to_numerical(groups))
+        return
+
+    @staticmethod
+    def _parse(ip_string):
+        """IPv6 string to group list, expanding :: and a trailing dotted IPv4 part (EX. ::ffff:10.0.0.1)."""
+        error = ValueError(f"{ip_string}: incorrect ip_string input to IPv6: must be 8 hex groups <= ffff " +
+                           "separated by :, with at most one :: for consecutive zero groups. EX: 2001:db8::1")
+        if "." in ip_string:
+            # a trailing IPv4 part stands for the last 2 groups
+            head, _, tail = ip_string.rpartition(":")
+            octets = tail.split(".")
+            if len(octets) != IP.OCTETS or not all(o.isdigit() and int(o) <= IP.MAX_OCTET_NUM for o in octets):
+                raise error
+            num = IP._to_numerical([int(octet) for octet in octets])
+            ip_string = f"{head}:{num >> IPv6.BITS_PER_GROUP:x}:{num & IPv6.MAX_GROUP_NUM:x}"
+        halves = ip_string.split("::")
+        if len(halves) > 2:
+            raise error
+        try:
+            parts = [[IPv6._parse_group(group) for group in half.split(":")] if half else [] for half in halves]
+        except ValueError:
+            raise error
+        if len(parts) == 1:
+            groups = parts[0]
+        else:
+            missing = IPv6.GROUPS - len(parts[0]) - len(parts[1])
+            if missing < 1:
+                raise error
+            groups = parts[0] + [0] * missing + parts[1]
+        if len(groups) != IPv6.GROUPS:
+            raise error
+        return groups
+
+    @staticmethod
+    def _parse_group(group):
+        """Hex group (1 to 4 digits) to int."""
+        if not 1 <= len(group) <= 4 or not all(c in "0123456789abcdefABCDEF" for c in group):
+            raise ValueError(f"{group}: incorrect IPv6 group.")
+        return int(group, 16)
+
+    @staticmethod
+    def _validate(groups):
+        """Validates a group list."""
+        if len(groups) != IPv6.GROUPS:
+            raise ValueError(f"{groups}: group count must be {IPv6.GROUPS}. EX: 2001:db8:0:0:0:0:0:1")
+        for group in groups:
+            if group < IPv6.MIN_GROUP_NUM or group > IPv6.MAX_GROUP_NUM:
+                raise ValueError(f"{groups}: groups must be integers <= {IPv6.MAX_GROUP_NUM:#x} " +
+                                 f"and >= {IPv6.MIN_GROUP_NUM}.")
+        return
+
+    @staticmethod
+    def _to_numerical(groups):
+        """# of hosts between IPv6 and ::"""
+        num = 0
+        for group in groups:
+            num = (num << IPv6.BITS_PER_GROUP) | group
+        return num
+
+    @staticmethod
+    def _from_numerical(num):
+        """
+        From # of hosts between IPv6 and :: to an IPv6 address (group list).
+        """
+        return [(num >> shift) & IPv6.MAX_GROUP_NUM for shift in range(IPv6.BITS - IPv6.BITS_PER_GROUP, -1, -IPv6.BITS_PER_GROUP)]
+
+    def __str__(self):
+        """String representation (RFC 5952): the longest run of 2+ zero groups (the first on ties) becomes ::"""
+        groups = self._from_numerical(self.ip_num)
+        best_start, best_length = -1, 1
+        start = None
+        for i, group in enumerate(groups + [1]):
+            if group == 0 and start is None:
+                start = i
+            elif group != 0 and start is not None:
+                if i - start > best_length:
+                    best_start, best_length = start, i - start
+                start = None
+        hexes = [f"{group:x}" for group in groups]
+        if best_start < 0:
+            return ":".join(hexes)
+        return ":".join(hexes[:best_start]) + "::" + ":".join(hexes[best_start + best_length:])
@@ -0,0 +1,83 @@
+"""
+ParseCache.py
+
+Contains class definition.
+"""
+
+import threading
+import collections
+
+from networking import CIDR
+
+
+class ParseCache:
+    """
+    Bounded LRU cache of parsed IP and CIDR strings.
+
+    IPs and CIDRs are immutable, so repeated strings can share one interned
+    instance instead of being split, converted and validated again. Keys are
+    the stripped strings; strings that fail to parse are not cached. Opt-in:
+    nothing is cached unless a ParseCache is used to parse.
+    """
+    DEFAULT_MAXSIZE = 1 << 16
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        """
+        Constructor: Creates a cache holding at most maxsize parsed strings.
+        """
+        if type(maxsize) != int or maxsize < 1:
+            raise ValueError(f"ParseCache maxsize must be a positive integer, not {maxsize}.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        return
+
+    def _get(self, kind, string, parse):
+        """Cached parse(string), keyed by kind and the stripped string."""
+        key = (kind, string.strip())
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        # parse outside the lock; errors propagate and nothing is cached
+        value = parse(key[1])
+        with self._lock:
+            # if another thread parsed the same string meanwhile, share its instance
+            value = self._entries.setdefault(key, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def ip(self, ip_string):
+        """Parses an IP or IPv6 string (EX. 10.0.0.1), or returns the interned IP."""
+        return self._get("ip", ip_string, lambda s: CIDR.family(s).IP_CLASS(ip_string=s))
+
+    def cidr(self, cidr_string):
+        """Parses a CIDR or CIDRv6 string (EX. 10.0.0.0/8), or returns the interned CIDR."""
+        return self._get("cidr", cidr_string, lambda s: CIDR.family(s)(cidr_string=s))
+
+    def clear(self):
+        """Empties the cache and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+        return
+
+    def info(self):
+        """Counters: hits, misses, current size and maxsize."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+    def __len__(self):
+        """# of cached strings."""
+        return len(self._entries)
+
+    def __repr__(self):
+        """Debug representation."""
+        return f"{type(self).__name__}(maxsize={self.maxsize}, hits={self.hits}, misses={self.misses}, size={len(self._entries)})"
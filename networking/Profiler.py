@@ -0,0 +1,175 @@
+"""
+Profiler.py
+
+Contains class definition.
+"""
+
+import json
+import time
+import contextlib
+import tracemalloc
+
+from networking import IP, IPv6, IPRange, CIDR
+
+
+class Profiler:
+    """
+    Records wall time, peak memory, and IP/IPRange/CIDR instance and copy counts per named phase.
+
+    Counting hooks are only installed on the classes while a profiler is running,
+    so disabled (or finished) profiling costs nothing. Every finished phase is
+    appended to phases, and passed to callback(phase) if one is given.
+    """
+    # every construction path of each counted class (CIDR constructors all go through _set).
+    # subclasses (IPv6, CIDRv6) count under their own name through the inherited wrappers.
+    CONSTRUCTORS = {
+        IP: ("__init__", "_new"),
+        IPv6: ("__init__",),
+        IPRange: ("__init__", "_from_ints"),
+        CIDR: ("_set",),
+    }
+
+    # shared by all running profilers: class name (or "copies") -> count
+    _counts = {}
+    _running = 0
+    _originals = []
+
+    def __init__(self, callback=None, memory=True, enabled=True):
+        """
+        Constructor.
+
+        memory traces allocations with tracemalloc (accurate, but slows the profiled code down).
+        """
+        self.callback = callback
+        self.memory = memory
+        self.enabled = enabled
+        self.phases = []
+        self._started = False
+        self._owns_tracing = False
+        return
+
+    @classmethod
+    def _install(cls):
+        """Wraps the constructors, __copy__ and __deepcopy__ of the counted classes with counters."""
+        counts = cls._counts
+
+        def counting(func, key=None, bound=False):
+            def wrapper(first, *args, **kwargs):
+                # counts under the class being built (or "copies")
+                name = key or (first.__name__ if bound else type(first).__name__)
+                counts[name] = counts.get(name, 0) + 1
+                return func(first, *args, **kwargs)
+            return wrapper
+
+        for klass, constructors in cls.CONSTRUCTORS.items():
+            for name in constructors + ("__copy__", "__deepcopy__"):
+                if name not in klass.__dict__:
+                    # inherited: already wrapped on the base class
+                    continue
+                original = klass.__dict__[name]
+                cls._originals.append((klass, name, original))
+                key = "copies" if name in ("__copy__", "__deepcopy__") else None
+                if isinstance(original, classmethod):
+                    setattr(klass, name, classmethod(counting(original.__func__, key, bound=True)))
+                else:
+                    setattr(klass, name, counting(original, key))
+        return
+
+    @classmethod
+    def _uninstall(cls):
+        """Restores the counted classes."""
+        for klass, name, original in cls._originals:
+            setattr(klass, name, original)
+        cls._originals = []
+        return
+
+    def start(self):
+        """Installs the counting hooks (and starts tracing memory)."""
+        if not self.enabled or self._started:
+            return
+        if Profiler._running == 0:
+            Profiler._install()
+        Profiler._running += 1
+        # don't interfere with tracing someone else started
+        self._owns_tracing = self.memory and not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+        self._started = True
+        return
+
+    def stop(self):
+        """Removes the counting hooks (and stops tracing memory)."""
+        if not self._started:
+            return
+        Profiler._running -= 1
+        if Profiler._running == 0:
+            Profiler._uninstall()
+        if self._owns_tracing:
+            tracemalloc.stop()
+        self._started = False
+        return
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def phase(self, name):
+        """Context manager that records a phase. Starts the profiler if needed."""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._phase(name)
+
+    @contextlib.contextmanager
+    def _phase(self, name):
+        self.start()
+        counts_before = dict(Profiler._counts)
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+            objects = {
+                key: count - counts_before.get(key, 0)
+                for key, count in Profiler._counts.items() if count != counts_before.get(key, 0)
+            }
+            phase = {"name": name, "seconds": seconds, "peak_memory_bytes": peak, "objects": objects}
+            self.phases.append(phase)
+            if self.callback is not None:
+                self.callback(phase)
+        return
+
+    def as_dict(self):
+        """All recorded phases, plus totals."""
+        totals = {}
+        for phase in self.phases:
+            for key, count in phase["objects"].items():
+                totals[key] = totals.get(key, 0) + count
+        return {
+            "phases": self.phases,
+            "total_seconds": sum(phase["seconds"] for phase in self.phases),
+            "total_objects": totals,
+        }
+
+    def to_json(self):
+        """JSON report."""
+        return json.dumps(self.as_dict(), indent=2)
+
+    def report(self):
+        """Human-readable report."""
+        lines = [f"{'Phase':<24}{'Time (s)':>12}{'Peak (MiB)':>12}  Objects"]
+        for phase in self.phases:
+            peak = phase["peak_memory_bytes"]
+            objects = ", ".join(f"{key}={count}" for key, count in sorted(phase["objects"].items())) or "-"
+            lines.append(f"{phase['name']:<24}{phase['seconds']:>12.4f}" +
+                         f"{(peak / 2**20) if peak is not None else float('nan'):>12.2f}  {objects}")
+        summary = self.as_dict()
+        objects = ", ".join(f"{key}={count}" for key, count in sorted(summary["total_objects"].items())) or "-"
+        lines.append(f"{'Total':<24}{summary['total_seconds']:>12.4f}{'':>12}  {objects}")
+        return "\n".join(lines)
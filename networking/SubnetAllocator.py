@@ -0,0 +1,198 @@
+"""
+SubnetAllocator.py
+
+Contains class definition.
+"""
+
+import heapq
+
+
+class SubnetAllocator:
+    """
+    Hands out and takes back subnets of a network CIDR, buddy-allocator style.
+
+    Free space is kept as per-mask free lists of aligned blocks (a set for
+    membership plus a min-heap for the lowest address), so allocate() and
+    free() split and merge buddies in O(32 + log n) without rescanning the network.
+    """
+    BEST_FIT = "best-fit"
+    LOWEST_ADDRESS = "lowest-address"
+
+    def __init__(self, network, allocated=()):
+        """
+        Constructor: Creates an allocator for a network CIDR, given already allocated subnet CIDRs.
+        """
+        self.network = network
+        self._max_mask = type(network).MAX_MASK
+        self._ip_class = type(network.base_ip)
+        # free lists: per mask, the first addresses of free blocks
+        self._free = [set() for _ in range(self._max_mask + 1)]
+        self._heaps = [[] for _ in range(self._max_mask + 1)]
+        # first address -> allocated CIDR
+        self._allocated = {}
+
+        allocated = sorted(allocated)
+        for cidr in allocated:
+            if not cidr.is_within(network):
+                raise ValueError(f"Allocated subnet CIDR {cidr} is not within network.")
+        for cidr, other in type(network).find_overlaps(allocated, fail_fast=True):
+            raise ValueError(f"Allocated subnets {cidr} and {other} overlap.")
+        # the gaps between allocations become the initial free blocks
+        start = network.first_num
+        for cidr in allocated:
+            self._allocated[cidr.first_num] = cidr
+            self._add_gap(start, cidr.first_num - 1)
+            start = cidr.last_num + 1
+        self._add_gap(start, network.last_num)
+        return
+
+    def _add_gap(self, first_num, last_num):
+        """Adds an unused range of addresses to the free lists."""
+        for base, mask in type(self.network).range_blocks(first_num, last_num):
+            self._push(base, mask)
+        return
+
+    def _push(self, base, mask):
+        """Adds a free block."""
+        self._free[mask].add(base)
+        heapq.heappush(self._heaps[mask], base)
+        return
+
+    def _peek(self, mask):
+        """Lowest free block of a mask, or None. Skips heap entries that are no longer free."""
+        heap, free = self._heaps[mask], self._free[mask]
+        while heap and heap[0] not in free:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _discard(self, base, mask):
+        """Removes a free block (its heap entry is skipped lazily)."""
+        self._free[mask].discard(base)
+        heap = self._heaps[mask]
+        # compact once stale entries dominate, to keep heaps O(n)
+        if len(heap) > 2 * len(self._free[mask]) + 32:
+            self._heaps[mask] = sorted(self._free[mask])
+        return
+
+    def _cidr(self, base, mask):
+        """Builds a CIDR for a block."""
+        return type(self.network)._new(self._ip_class._new(base), mask)
+
+    def allocate(self, mask, strategy=BEST_FIT):
+        """
+        Allocates a free subnet CIDR of a mask.
+
+        best-fit takes the lowest block from the smallest free list that fits (limiting fragmentation),
+        lowest-address takes the lowest-addressed block that fits.
+        Larger blocks are split, and the unused buddies go back to the free lists.
+        """
+        type(self.network).validate_mask(mask)
+        if strategy not in (SubnetAllocator.BEST_FIT, SubnetAllocator.LOWEST_ADDRESS):
+            raise ValueError(f"Unknown allocation strategy {strategy}.")
+        if mask < self.network.mask:
+            raise ValueError(f"/{mask} subnets do not fit in network {self.network}.")
+        found = None
+        # smallest fitting blocks first
+        for block_mask in range(mask, self.network.mask - 1, -1):
+            base = self._peek(block_mask)
+            if base is None:
+                continue
+            if found is None or (strategy == SubnetAllocator.LOWEST_ADDRESS and base < found[0]):
+                found = (base, block_mask)
+            if strategy == SubnetAllocator.BEST_FIT:
+                break
+        if found is None:
+            raise ValueError(f"No free /{mask} subnet left in {self.network}.")
+        base, block_mask = found
+        # _peek left the block at the top of its heap
+        self._free[block_mask].remove(base)
+        heapq.heappop(self._heaps[block_mask])
+        # split down to the requested mask, freeing the upper halves
+        while block_mask < mask:
+            block_mask += 1
+            self._push(base + (1 << (self._max_mask - block_mask)), block_mask)
+        cidr = self._cidr(base, mask)
+        self._allocated[base] = cidr
+        return cidr
+
+    def allocate_many(self, masks, strategy=BEST_FIT):
+        """
+        Allocates one subnet CIDR per mask in a batch. Returns the CIDRs in the order of masks.
+
+        The largest subnets are placed first, so the smaller ones fill the leftovers instead of splitting
+        the large free blocks. All or nothing: if any subnet does not fit, the batch is rolled back.
+        """
+        masks = list(masks)
+        cidrs = [None] * len(masks)
+        placed = []
+        try:
+            # largest first; sorted is stable, so equal masks keep their order
+            for i in sorted(range(len(masks)), key=lambda i: masks[i]):
+                cidrs[i] = self.allocate(masks[i], strategy)
+                placed.append(cidrs[i])
+        except ValueError as e:
+            # freeing in reverse merges the buddies back exactly as they were
+            for cidr in reversed(placed):
+                self.free(cidr)
+            raise ValueError(f"Cannot place all {len(masks)} subnets ({len(placed)} placed): {e}") from e
+        return cidrs
+
+    def reserve(self, cidr):
+        """Allocates a specific subnet CIDR, which must be free."""
+        base = cidr.first_num
+        if not cidr.is_within(self.network):
+            raise ValueError(f"Subnet CIDR {cidr} is not within network.")
+        # find the free block that contains the CIDR
+        for block_mask in range(cidr.mask, self.network.mask - 1, -1):
+            host_bits = self._max_mask - block_mask
+            block = (base >> host_bits) << host_bits
+            if block in self._free[block_mask]:
+                break
+        else:
+            raise ValueError(f"Subnet CIDR {cidr} is not free.")
+        self._discard(block, block_mask)
+        # split down to the CIDR, freeing the halves that don't contain it
+        while block_mask < cidr.mask:
+            block_mask += 1
+            size = 1 << (self._max_mask - block_mask)
+            half = block + size
+            if base >= half:
+                self._push(block, block_mask)
+                block = half
+            else:
+                self._push(half, block_mask)
+        self._allocated[base] = cidr
+        return cidr
+
+    def free(self, cidr):
+        """Frees an allocated subnet CIDR, merging it with free buddies."""
+        allocated = self._allocated.get(cidr.first_num)
+        if allocated is None or allocated.mask != cidr.mask:
+            raise ValueError(f"Subnet CIDR {cidr} is not allocated.")
+        del self._allocated[cidr.first_num]
+        base, mask = cidr.first_num, cidr.mask
+        while mask > self.network.mask:
+            buddy = base ^ (1 << (self._max_mask - mask))
+            if buddy not in self._free[mask]:
+                break
+            self._discard(buddy, mask)
+            base = min(base, buddy)
+            mask -= 1
+        self._push(base, mask)
+        return
+
+    def free_cidrs(self):
+        """Free blocks, sorted."""
+        return sorted(self._cidr(base, mask) for mask, free in enumerate(self._free) for base in free)
+
+    def allocated_cidrs(self):
+        """Allocated subnet CIDRs, sorted."""
+        return sorted(self._allocated.values())
+
+    def free_hosts(self):
+        """# of free addresses."""
+        return sum(len(free) << (self._max_mask - mask) for mask, free in enumerate(self._free))
+
+    def __repr__(self):
+        """Debug representation."""
+        return f"{type(self).__name__}({self.network!r}, {len(self._allocated)} allocated)"
@@ -0,0 +1,125 @@
+"""
+UnusedSpace.py
+
+Contains class definition.
+"""
+
+import bisect
+
+from networking import IPSet
+
+
+class UnusedSpace:
+    """
+    Unused space of a network CIDR, kept up to date as subnets are allocated and released.
+
+    The unused addresses are an IPSet (a new allocation is valid exactly when the
+    unused space contains it), and the mask counts of the minimal unused CIDR list
+    are kept alongside, so a change only touches the intervals around it: O(log n)
+    searches and O(MAX_MASK) block updates instead of recomputing the whole network.
+    """
+
+    def __init__(self, network, allocated=()):
+        """
+        Constructor: Computes the unused space of a network CIDR, given already allocated subnet CIDRs.
+        """
+        self.network = network
+        self.cidr_class = type(network)
+        allocated = list(allocated)
+        for cidr in allocated:
+            if not cidr.is_within(network):
+                raise ValueError(f"Allocated subnet CIDR {cidr} is not within network.")
+        for cidr, other in self.cidr_class.find_overlaps(allocated, fail_fast=True):
+            raise ValueError(f"Allocated subnets {cidr} and {other} overlap.")
+        # first address -> allocated CIDR
+        self._allocated = {cidr.first_num: cidr for cidr in allocated}
+        self.free = IPSet([network], self.cidr_class) - IPSet(allocated, self.cidr_class)
+        self._counts = self.free.mask_counts()
+        return
+
+    def _apply(self, removed, added):
+        """
+        Updates the mask counts for changed unused intervals.
+
+        Returns (removed, added) sorted lists of the CIDRs that left and joined the minimal unused CIDR list.
+        """
+        range_blocks = self.cidr_class.range_blocks
+        removed_blocks = {block for first_num, last_num in removed for block in range_blocks(first_num, last_num)}
+        added_blocks = {block for first_num, last_num in added for block in range_blocks(first_num, last_num)}
+        # blocks that survive a change are neither
+        removed_blocks, added_blocks = removed_blocks - added_blocks, added_blocks - removed_blocks
+        for _, mask in removed_blocks:
+            self._counts[mask] -= 1
+        for _, mask in added_blocks:
+            self._counts[mask] += 1
+        return self._cidrs(removed_blocks), self._cidrs(added_blocks)
+
+    def _cidrs(self, blocks):
+        """Sorted CIDRs of (base, mask) blocks."""
+        ip_class = self.cidr_class.IP_CLASS
+        return [self.cidr_class._new(ip_class._new(base), mask) for base, mask in sorted(blocks)]
+
+    def allocate(self, cidr):
+        """
+        Marks a subnet CIDR as allocated. Raises ValueError if it is outside the network or overlaps an allocation.
+
+        Returns (removed, added): the CIDRs that left and joined the unused CIDR list.
+        """
+        if not cidr.is_within(self.network):
+            raise ValueError(f"Allocated subnet CIDR {cidr} is not within network.")
+        if cidr not in self.free:
+            raise ValueError(f"Allocated subnets {self._overlapping(cidr)} and {cidr} overlap.")
+        self._allocated[cidr.first_num] = cidr
+        return self._apply(*self.free.discard(cidr))
+
+    def _overlapping(self, cidr):
+        """
+        Allocated CIDR that overlaps a subnet CIDR of the network that isn't unused. O(log n + MAX_MASK).
+        """
+        # first allocated address of the subnet: its first address, or the one after the unused interval holding it
+        starts, ends = self.free._starts, self.free._ends
+        i = bisect.bisect_right(starts, cidr.first_num) - 1
+        num = ends[i] + 1 if i >= 0 and cidr.first_num <= ends[i] else cidr.first_num
+        # allocations are aligned blocks, so the one holding num starts at num with its host bits cleared
+        max_mask = self.cidr_class.MAX_MASK
+        for host_bits in range(max_mask + 1):
+            other = self._allocated.get((num >> host_bits) << host_bits)
+            if other is not None and num <= other.last_num:
+                return other
+        raise ValueError(f"Subnet CIDR {cidr} overlaps no allocated subnet.")
+
+    def release(self, cidr):
+        """
+        Marks an allocated subnet CIDR as unused again. Raises ValueError if it isn't allocated.
+
+        Returns (removed, added): the CIDRs that left and joined the unused CIDR list.
+        """
+        allocated = self._allocated.get(cidr.first_num)
+        if allocated is None or allocated.mask != cidr.mask:
+            raise ValueError(f"Subnet CIDR {cidr} is not allocated.")
+        del self._allocated[cidr.first_num]
+        return self._apply(*self.free.add(cidr))
+
+    def cidrs(self):
+        """Minimal list of unused CIDRs, in order."""
+        return self.free.cidrs()
+
+    def allocated_cidrs(self):
+        """Allocated subnet CIDRs, sorted."""
+        return sorted(self._allocated.values())
+
+    def mask_counts(self):
+        """# of blocks of each mask (index) in the minimal unused CIDR list."""
+        return list(self._counts)
+
+    def capacity(self):
+        """# of aligned subnets of each mask (index) that fit in the unused space. O(MAX_MASK ** 2)."""
+        return IPSet._capacity(self._counts)
+
+    def free_hosts(self):
+        """# of unused addresses."""
+        return sum(count << (self.cidr_class.MAX_MASK - mask) for mask, count in enumerate(self._counts))
+
+    def __repr__(self):
+        """Debug representation."""
+        return f"{type(self).__name__}({self.network!r}, {len(self._allocated)} allocated, {self.free_hosts()} unused hosts)"
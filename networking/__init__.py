@@ -4,5 +4,18 @@ Package initializer.
 Imports classes from directory.
 """
 from .IP import IP
+from .IPv6 import IPv6
 from .IPRange import IPRange
+from .CIDRDivision import CIDRDivision
 from .CIDR import CIDR
+from .CIDRv6 import CIDRv6
+from .IPSet import IPSet
+from .ParseCache import ParseCache
+from .CIDRReader import CIDRReader
+from .Profiler import Profiler
+from .CIDRArray import CIDRArray
+from .CIDRSnapshot import CIDRSnapshot
+from .CIDRTrie import CIDRTrie
+from .SubnetAllocator import SubnetAllocator
+from .IPClassifier import IPClassifier
+from .UnusedSpace import UnusedSpace
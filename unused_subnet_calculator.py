@@ -5,141 +5,855 @@ unused_subnet_calculator.py
 Calculates unused subnets given an address space and allocated subnets.
 """
 
+import os
+import io
+import csv
+import time
 import itertools
+import json
+import concurrent.futures
 import argparse
 import sys
 
-from networking import IP, IPRange, CIDR
-
-# get command line args
-parser = argparse.ArgumentParser()
-parser.add_argument(
-    "-n",
-    "--network-cidr",
-    help="CIDR representing entire virtual network.",
-    dest="network",
-    type=str,
-    required=True
-)
-group = parser.add_mutually_exclusive_group()
-group.add_argument(
-    "-a",
-    "--allocated-subnet-list",
-    help="List of CIDRs that have already been allocated for subnets. Conflicts with (-f|--allocated-subnet-file)",
-    dest="allocated",
-    type=str,
-    nargs="*"
-)
-group.add_argument(
-    "-f",
-    "--allocated-subnet-file",
-    help="Relative filepath containing newline-separated CIDRs that have already been allocated for subnets. Conflicts with (-a|--allocated-subnet-list)",
-    dest="allocated_file",
-    type=str
-)
-parser.add_argument(
-    "-m",
-    "--mask-filter",
-    help="Output filtering: will return all possible unused subnets with a specific mask (0-32).",
-    dest="mask",
-    type=int,
-    required=False
-)
-args = parser.parse_args()
-
-try:
-    # initialize existing virtual network
-    print("Analyzing existing network...", end=" ")
-    network_cidr = CIDR(cidr_string=args.network)
-    print("Done.\n")
-    network_cidr.print_summary()
-    
-    # validate allocated subnets
-    print("Validating allocated subnets...", end=" ")
-    allocated = args.allocated
-    if allocated is None:
-        if args.allocated_file is None:
-            raise RuntimeError("No allocated subnets found. Must provide either a file (-f) containing " + 
-                               "newline separated subnets, or a list (-a)" )
-        # pull file values into a list
-        with open(args.allocated_file, "r") as allocated_file:
-            allocated = [s for s in allocated_file.read().splitlines() if s.strip()]
-
-    # create CIDR objects per allocated subnets in virtual network
+from networking import CIDR, CIDRv6, IPSet, CIDRReader, CIDRSnapshot, ParseCache, Profiler, SubnetAllocator, UnusedSpace
+
+FORMATS = ("text", "jsonl", "csv")
+CSV_HEADER = "cidr,first_ip,last_ip,hosts\n"
+CAPACITY_CSV_HEADER = "mask,blocks\n"
+MANIFEST_CSV_HEADER = "name," + CSV_HEADER
+WATCH_CSV_HEADER = "change," + CSV_HEADER
+TREE_CSV_HEADER = "node," + CSV_HEADER
+MANIFEST_CAPACITY_CSV_HEADER = "name," + CAPACITY_CSV_HEADER
+# # of lines joined into each write to the output stream
+WRITE_BATCH_SIZE = 8192
+
+
+# opt-in ParseCache used for every CIDR string parsed here (see enable_parse_cache)
+parse_cache = None
+
+
+def enable_parse_cache(maxsize=ParseCache.DEFAULT_MAXSIZE):
+    """Parses (and interns) CIDR strings through a bounded LRU ParseCache from now on. Returns the cache."""
+    global parse_cache
+    if parse_cache is None or parse_cache.maxsize != maxsize:
+        parse_cache = ParseCache(maxsize)
+    return parse_cache
+
+
+def _to_cidr(cidr):
+    """Accepts either a CIDR (or CIDRv6) or a CIDR string of either family."""
+    if isinstance(cidr, CIDR):
+        return cidr
+    return parse_cache.cidr(cidr) if parse_cache is not None else CIDR.family(cidr)(cidr_string=cidr)
+
+
+def open_allocated(path):
+    """
+    Opens an allocated subnet file: a binary CIDRSnapshot (detected from its magic bytes, checksum verified),
+    or newline-separated CIDRs streamed by a CIDRReader. Both are iterables of CIDRs.
+    """
+    if path != "-" and CIDRSnapshot.is_snapshot(path):
+        return CIDRSnapshot(path, verify=True)
+    return CIDRReader(path, cache=parse_cache)
+
+
+def validate_allocated(network_cidr, allocated):
+    """
+    Validates allocated subnets: each must be within the network, and none may overlap.
+
+    allocated is an iterable of CIDRs or CIDR strings (EX. a CIDRReader). Returns the list of CIDRs.
+    """
+    subnet_cidrs = parse_allocated(network_cidr, allocated)
+    check_overlaps(subnet_cidrs)
+    return subnet_cidrs
+
+
+def parse_allocated(network_cidr, allocated):
+    """Parses allocated subnets into a list of CIDRs, verifying that each is within the network."""
     subnet_cidrs = []
-    for cidr_string in allocated:
+    for subnet_cidr in allocated:
+        subnet_cidr = _to_cidr(subnet_cidr)
         # verify that each CIDR exists within the larger network
-        subnet_cidrs.append(CIDR(cidr_string=cidr_string))
-        if not subnet_cidrs[-1].is_within(network_cidr):
-            raise RuntimeError(f"Allocated subnet CIDR {subnet_cidrs[-1]} is not within network.")
-    # verify that each of the subnets do not overlap with each other.
-    for i, subnet_cidr in enumerate(subnet_cidrs):
-        for j, other_subnet_cidr in enumerate(subnet_cidrs):
-            if i != j and subnet_cidr.does_overlap(other_subnet_cidr):
-                raise RuntimeError(f"Allocated subnets {subnet_cidr} and {other_subnet_cidr} overlap.")
-    print("Done.")
-    
-    print("Calculating unused subnet CIDRs...", end=" ")
-    # create IPRange of network to get the start and end IPs
-    network_range = IPRange(cidr=network_cidr)
-    # create a list of all IPRanges in network and sort it
-    subnet_ranges = sorted([IPRange(cidr=subnet_cidr) for subnet_cidr in subnet_cidrs])
-    # create a list of all IPs in network
-    ips = [network_range[0]] # start of network
-    for ipr in subnet_ranges:
-        ips.append(ipr[0])
-        ips.append(ipr[1])
-    ips.append(network_range[1]) # end of network
-
-    # from the list of the IPs in the network, create IPRanges that represent
-    # the unused ranges of IP addresses.
-    # (ex) if network = IPRange(0, 10) & allocated = IPRange(2, 5)
-    #      then unused = IPRange(0,1) + IPRange(6,10).
-    # rules:
-    # (1) network boundaries (in the above example IP(0) and IP(10) are inclusive
-    # (2) however, subnet boundaries are exclusive, which is why even if allocated 
-    #     IPRange(2,5), we want 0 to 2-1, and then then 5+1 to 10
-    unused_ranges = []
-    for first_ip, second_ip in zip(*[iter(ips)]*2):
-        # fip == sip on border may occur, so we don't want a CIDR to represent that
-        # fip + 1 == sip is possible as subnet edges may be next to each other, so no CIDR.
-        if first_ip == second_ip or first_ip.is_adjacent(second_ip):
+        if not subnet_cidr.is_within(network_cidr):
+            raise RuntimeError(f"Allocated subnet CIDR {subnet_cidr} is not within network.")
+        subnet_cidrs.append(subnet_cidr)
+    if isinstance(allocated, CIDRReader) and allocated.errors:
+        raise RuntimeError(allocated.format_errors())
+    return subnet_cidrs
+
+
+def check_overlaps(subnet_cidrs):
+    """Verifies that allocated subnet CIDRs do not overlap with each other."""
+    for subnet_cidr, other_subnet_cidr in CIDR.find_overlaps(subnet_cidrs, fail_fast=True):
+        raise RuntimeError(f"Allocated subnets {subnet_cidr} and {other_subnet_cidr} overlap.")
+    return
+
+
+def unused_space(network_cidr, subnet_cidrs):
+    """IPSet of the network not covered by allocated subnet CIDRs."""
+    cidr_class = type(network_cidr)
+    return IPSet([network_cidr], cidr_class) - IPSet(subnet_cidrs, cidr_class)
+
+
+def unused_ranges(network_cidr, subnet_cidrs):
+    """Generates the IPRanges of the network not covered by (validated) allocated subnet CIDRs, in order."""
+    yield from unused_space(network_cidr, subnet_cidrs).ranges()
+
+
+def _unused_cidrs(network_cidr, subnet_cidrs):
+    """Generates the unused subnet CIDRs of a network, given validated allocated subnet CIDRs."""
+    # each free range is converted into a minimum number of CIDR blocks
+    return unused_space(network_cidr, subnet_cidrs).iter_cidrs()
+
+
+def unused_cidrs(network, allocated, mask=None):
+    """
+    Generates the unused subnet CIDRs of a network, in order.
+
+    network is a CIDR (or CIDR string), allocated an iterable of CIDRs (or CIDR strings).
+    If a mask is given, unused subnets are split/filtered to CIDRs of that mask instead.
+    """
+    network_cidr = _to_cidr(network)
+    if mask is not None:
+        type(network_cidr).validate_mask(mask)
+    subnet_cidrs = validate_allocated(network_cidr, allocated)
+    cidrs = _unused_cidrs(network_cidr, subnet_cidrs)
+    if mask is None:
+        yield from cidrs
+    else:
+        # filter out cidrs that have masks > mask, since those can't be broken down
+        # for cidrs that have masks < mask, split them further
+        # for cidrs that have masks = mask, simply append them
+        # divide returns lazy views, so the subnets are streamed rather than built up front
+        for cidr in cidrs:
+            yield from cidr.divide(mask)
+
+
+def parse_plan(specs, cidr_class=CIDR):
+    """
+    Parses subnet requests of the form COUNTx/MASK (EX. 40x/24 for 40 /24 subnets), or /MASK for a single subnet.
+
+    Masks are validated for the network's family (cidr_class). Returns the list of requested masks, one per subnet.
+    """
+    masks = []
+    for spec in specs:
+        count, separator, mask = spec.rpartition("/")
+        try:
+            count = int(count.rstrip("xX\u00d7")) if count else 1
+            mask = int(mask)
+            if not separator or count < 1:
+                raise ValueError("Incorrectly formatted subnet request.")
+            cidr_class.validate_mask(mask)
+        except ValueError:
+            raise RuntimeError(f"{spec}: subnet requests are COUNTx/MASK, EX. 40x/24, or /MASK for a single subnet.")
+        masks.extend([mask] * count)
+    return masks
+
+
+def plan_subnets(network, allocated, masks):
+    """
+    Places a batch of requested subnets (a list of masks) in the unused space of a network in one pass.
+
+    Subnets are placed largest first, each in the smallest free block that fits (best-fit), which keeps
+    the large free blocks whole. Returns the placed CIDRs in the order of masks. Raises ValueError if the batch does not fit.
+    """
+    network_cidr = _to_cidr(network)
+    allocator = SubnetAllocator(network_cidr, validate_allocated(network_cidr, allocated))
+    return allocator.allocate_many(masks)
+
+
+def _format_line(cidr, fmt):
+    """Formats a single CIDR as an output line."""
+    if fmt == "text":
+        return f"{cidr}\n"
+    first_ip, last_ip = cidr.cidr_range
+    if fmt == "csv":
+        return f"{cidr},{first_ip},{last_ip},{cidr.hosts}\n"
+    # CIDRs and IPs never need escaping, so JSON is formatted directly
+    return f'{{"cidr": "{cidr}", "first_ip": "{first_ip}", "last_ip": "{last_ip}", "hosts": {cidr.hosts}}}\n'
+
+
+def _csv_field(value):
+    """Quotes a free-form value (EX. a node name) as a single CSV field, as csv.writer would."""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow((value,))
+    return buffer.getvalue()
+
+
+def write_cidrs(cidrs, fmt="text", out=None):
+    """
+    Writes CIDRs as text (one per line), JSON Lines, or CSV (with a header).
+
+    Lines are joined into batches, so the output stream sees one write per WRITE_BATCH_SIZE CIDRs.
+    Returns the # of CIDRs written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format {fmt}, must be one of {', '.join(FORMATS)}.")
+    out = sys.stdout if out is None else out
+    if fmt == "csv":
+        out.write(CSV_HEADER)
+    lines = (_format_line(cidr, fmt) for cidr in cidrs)
+    written = 0
+    while True:
+        batch = list(itertools.islice(lines, WRITE_BATCH_SIZE))
+        if not batch:
+            break
+        out.write("".join(batch))
+        written += len(batch)
+    out.flush()
+    return written
+
+
+def capacity_report(free):
+    """
+    Capacity of unused space (an IPSet), computed in closed form from its minimal CIDR list.
+
+    blocks[mask] is the # of aligned subnets of that mask (0-32, or 0-128 for IPv6) that can still be allocated.
+    fragmentation is 1 - (largest contiguous free range / free hosts).
+    """
+    largest_range = free.largest_interval()
+    largest_cidr = free.largest_cidr()
+    ip_class = free.cidr_class.IP_CLASS
+    return {
+        "free_hosts": free.size,
+        "largest_free_range": None if largest_range is None else {
+            "first_ip": str(ip_class._new(largest_range[0])),
+            "last_ip": str(ip_class._new(largest_range[1])),
+            "hosts": largest_range[1] - largest_range[0] + 1,
+        },
+        "largest_free_cidr": None if largest_cidr is None else str(largest_cidr),
+        "fragmentation": free.fragmentation(),
+        "blocks": free.capacity(),
+    }
+
+
+def write_capacity(report, fmt="text", out=None):
+    """Writes a capacity report as text, a single JSON line, or CSV (mask,blocks rows)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format {fmt}, must be one of {', '.join(FORMATS)}.")
+    out = sys.stdout if out is None else out
+    if fmt == "jsonl":
+        out.write(json.dumps(report) + "\n")
+    elif fmt == "csv":
+        out.write(CAPACITY_CSV_HEADER)
+        out.write("".join(f"{mask},{count}\n" for mask, count in enumerate(report["blocks"])))
+    else:
+        largest_range = report["largest_free_range"]
+        out.write(f"Free Hosts: {report['free_hosts']}\n")
+        if largest_range is not None:
+            out.write(f"Largest Free Range: {largest_range['first_ip']} - {largest_range['last_ip']} " +
+                      f"({largest_range['hosts']} hosts)\n")
+            out.write(f"Largest Free CIDR: {report['largest_free_cidr']}\n")
+        out.write(f"Fragmentation: {report['fragmentation']:.4f}\n\n")
+        out.write("Mask  Available Subnets\n")
+        out.write("".join(f"/{mask:<4} {count}\n" for mask, count in enumerate(report["blocks"])))
+    out.flush()
+    return
+
+
+def _read_allocation_lines(path):
+    """Reads an allocated subnet file. Returns {line: CIDR}, or raises RuntimeError listing the unparse-able lines."""
+    reader = CIDRReader(path)
+    allocations = {}
+    for line_number, line in reader.lines():
+        try:
+            allocations[line] = _to_cidr(line)
+        except ValueError as e:
+            reader.errors.append((line_number, line, str(e)))
+    if reader.errors:
+        raise RuntimeError(reader.format_errors())
+    return allocations
+
+
+def _format_change(cidr, change, fmt):
+    """Formats a change (added/removed) of the unused subnet CIDR list as an output line."""
+    if fmt == "text":
+        return f"{'+' if change == 'added' else '-'} {cidr}\n"
+    if fmt == "csv":
+        return f"{change},{_format_line(cidr, fmt)}"
+    return f'{{"change": "{change}", ' + _format_line(cidr, fmt)[1:]
+
+
+def _record_changes(changes, removed, added):
+    """Accumulates net changes of the unused CIDR list (CIDR -> "added"/"removed"); opposite changes cancel out."""
+    for cidr in removed:
+        if changes.pop(cidr, None) != "added":
+            changes[cidr] = "removed"
+    for cidr in added:
+        if changes.pop(cidr, None) != "removed":
+            changes[cidr] = "added"
+    return
+
+
+def watch(network_cidr, path, interval=1.0, fmt="text", out=None, log=None, polls=None):
+    """
+    Follows an allocated subnet file, and writes how the unused subnet CIDRs change whenever it does.
+
+    The unused space is computed once, and then kept up to date (UnusedSpace): only the lines that
+    were added to or removed from the file are applied. The initial unused subnets are written first
+    (as added changes for jsonl/csv). Invalid or conflicting new lines are reported to log and skipped,
+    and retried whenever the file changes. Polls the file every interval seconds, forever unless polls is given;
+    a file that can't be read (EX. while it is replaced) is reported to log and polled again.
+    """
+    if path == "-" or CIDRSnapshot.is_snapshot(path):
+        raise RuntimeError("--watch needs a newline-separated allocated subnet file (-f), not stdin or a snapshot.")
+    out = sys.stdout if out is None else out
+    log = sys.stderr if log is None else log
+    # line -> allocated CIDR (None for lines that were rejected)
+    allocations = _read_allocation_lines(path)
+    state = UnusedSpace(network_cidr, parse_allocated(network_cidr, allocations.values()))
+    if fmt == "text":
+        write_cidrs(state.cidrs(), fmt, out)
+    else:
+        if fmt == "csv":
+            out.write(WATCH_CSV_HEADER)
+        out.write("".join(_format_change(cidr, "added", fmt) for cidr in state.cidrs()))
+        out.flush()
+    last_stat = None
+    unreadable = False
+    while polls is None or polls > 0:
+        if polls is not None:
+            polls -= 1
+        try:
+            stat = os.stat(path)
+            if (stat.st_mtime_ns, stat.st_size) == last_stat:
+                time.sleep(interval)
+                continue
+            lines = {line for _, line in CIDRReader(path).lines()}
+        except OSError as e:
+            # EX. the file is being replaced: try again on the next poll (reporting it once)
+            if not unreadable:
+                print(f"ERROR: {e}", file=log)
+            unreadable = True
+            time.sleep(interval)
             continue
-        unused_ranges.append(
-            IPRange(
-                first_ip=first_ip.add_hosts(int(first_ip != ips[0])),
-                second_ip=second_ip.remove_hosts(int(second_ip != ips[-1]))
-            )
-        )
-    
-    # convert each of the IPRanges into a minimum number of CIDR blocks
-    # since each call to CIDR.from_ip_range returns a list, we want to condense into 1 list
-    unused_cidrs = list(itertools.chain.from_iterable(
-        [CIDR.from_ip_range(ipr) for ipr in unused_ranges]
-    ))
-
-    print("Done.\n")
-    # print results
-    [print(u) for u in unused_cidrs]
-
-    # if a specific mask is requested, breaks down the CIDRs from above to reach that
+        unreadable = False
+        last_stat = (stat.st_mtime_ns, stat.st_size)
+        changes = {}
+        # releases first, so a replaced allocation doesn't conflict with its replacement
+        for line in allocations.keys() - lines:
+            cidr = allocations.pop(line)
+            if cidr is not None:
+                _record_changes(changes, *state.release(cidr))
+        # new lines, and previously rejected ones: a release may have made room for them
+        new_lines = lines - allocations.keys()
+        rejected = {line for line, cidr in allocations.items() if cidr is None}
+        for line in sorted(new_lines | rejected):
+            allocations[line] = None
+            try:
+                cidr = _to_cidr(line)
+                _record_changes(changes, *state.allocate(cidr))
+                allocations[line] = cidr
+            except ValueError as e:
+                # rejected lines were already reported
+                if line in new_lines:
+                    print(f"ERROR: {e}", file=log)
+        if changes:
+            out.write("".join(_format_change(cidr, change, fmt) for cidr, change in sorted(changes.items())))
+            out.flush()
+        time.sleep(interval)
+    return
+
+
+def read_manifest(path):
+    """
+    Reads a manifest of networks: JSON Lines, one object per network, EX.
+    {"name": "vpc-1", "network": "10.0.0.0/16", "allocated": ["10.0.0.0/24"]}
+    or {"network": "10.1.0.0/16", "allocated_file": "vpc-2.txt"} (relative to the manifest).
+
+    Blank lines and lines starting with # are skipped. Returns the list of entries.
+    """
+    entries = []
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, "r") as manifest:
+        for line_number, line in enumerate(manifest, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                entry = json.loads(line)
+                if not isinstance(entry, dict) or not isinstance(entry.get("network"), str):
+                    raise ValueError("missing network")
+                if ("allocated" in entry) == ("allocated_file" in entry):
+                    raise ValueError("needs exactly one of allocated or allocated_file")
+            except ValueError as e:
+                raise RuntimeError(f"{path}, line {line_number}: manifest entries are JSON objects with a network " +
+                                   f"and either allocated (a list of CIDRs) or allocated_file ({e}).")
+            entry.setdefault("name", entry["network"])
+            if "allocated_file" in entry:
+                entry["allocated_file"] = os.path.join(base_dir, entry["allocated_file"])
+            entries.append(entry)
+    return entries
+
+
+def _format_network(name, network_cidr, results, capacity, fmt):
+    """Formats the unused subnet CIDRs (or capacity report) of one manifest network."""
+    out = io.StringIO()
+    if fmt == "jsonl":
+        key = "capacity" if capacity else "unused"
+        value = results if capacity else [str(cidr) for cidr in results]
+        out.write(json.dumps({"name": name, "network": str(network_cidr), key: value}) + "\n")
+    elif fmt == "csv":
+        # every row is prefixed with the (quoted) name of its network
+        prefix = _csv_field(name)
+        if capacity:
+            out.write("".join(f"{prefix},{mask},{count}\n" for mask, count in enumerate(results["blocks"])))
+        else:
+            out.write("".join(f"{prefix},{_format_line(cidr, fmt)}" for cidr in results))
+    else:
+        out.write(f"{name} ({network_cidr}):\n")
+        if capacity:
+            write_capacity(results, fmt, out)
+        else:
+            write_cidrs(results, fmt, out)
+        out.write("\n")
+    return out.getvalue()
+
+
+def _run_manifest_entry(entry, mask, capacity, fmt, cache_size=None):
+    """
+    Computes one manifest network (in a worker process).
+
+    With a cache_size, each worker keeps its own ParseCache across the networks it computes.
+    Returns (name, formatted output, error message), with either output or error set.
+    """
+    name = entry["name"]
+    if cache_size is not None:
+        enable_parse_cache(cache_size)
+    try:
+        network_cidr = _to_cidr(entry["network"])
+        if "allocated_file" in entry:
+            allocated = open_allocated(entry["allocated_file"])
+        else:
+            allocated = entry["allocated"]
+        if capacity:
+            results = capacity_report(unused_space(network_cidr, validate_allocated(network_cidr, allocated)))
+        else:
+            results = unused_cidrs(network_cidr, allocated, mask)
+        return name, _format_network(name, network_cidr, results, capacity, fmt), None
+    except Exception as e:
+        return name, None, str(e)
+
+
+def run_manifest(entries, workers=None, mask=None, capacity=False, fmt="text", out=None, log=None, cache_size=None):
+    """
+    Computes the unused subnets (or capacity) of every manifest network across a pool of worker processes.
+
+    Results are written to out as each network finishes, so their order is not the manifest's.
+    Errors are written to log (stderr by default). Returns the # of networks that failed.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format {fmt}, must be one of {', '.join(FORMATS)}.")
+    out = sys.stdout if out is None else out
+    log = sys.stderr if log is None else log
+    if fmt == "csv":
+        out.write(MANIFEST_CAPACITY_CSV_HEADER if capacity else MANIFEST_CSV_HEADER)
+    failed = 0
+    if workers == 1:
+        # no pool to start up
+        results = (_run_manifest_entry(entry, mask, capacity, fmt, cache_size) for entry in entries)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        futures = [executor.submit(_run_manifest_entry, entry, mask, capacity, fmt, cache_size) for entry in entries]
+        results = (future.result() for future in concurrent.futures.as_completed(futures))
+    try:
+        for name, output, error in results:
+            if error is not None:
+                failed += 1
+                print(f"ERROR: {name}: {error}", file=log)
+                continue
+            out.write(output)
+            out.flush()
+    finally:
+        if workers != 1:
+            executor.shutdown(cancel_futures=True)
+    return failed
+
+
+def read_tree(tree):
+    """
+    Flattens an allocation tree: a JSON object (or a list of them) with a cidr, an optional name,
+    and optional children of the same shape, EX.
+    {"name": "vpc", "cidr": "10.0.0.0/16", "children": [{"name": "zone-a", "cidr": "10.0.0.0/18"}]}
+
+    Returns the nodes as (CIDR, name, parent index or None, depth) tuples, parents before their children.
+    """
+    nodes = []
+    # (node object, parent index, depth)
+    pending = [(root, None, 0) for root in reversed(tree if isinstance(tree, list) else [tree])]
+    while pending:
+        node, parent, depth = pending.pop()
+        if not isinstance(node, dict) or not isinstance(node.get("cidr"), str) or \
+                not isinstance(node.get("children", []), list):
+            raise RuntimeError(f"{json.dumps(node)[:80]}: tree nodes are JSON objects with a cidr, " +
+                               "an optional name, and optional children (a list of nodes).")
+        cidr = _to_cidr(node["cidr"])
+        if parent is not None and not cidr.is_within(nodes[parent][0]):
+            raise RuntimeError(f"Allocated subnet CIDR {cidr} is not within its parent {nodes[parent][0]}.")
+        nodes.append((cidr, node.get("name", str(cidr)), parent, depth))
+        index = len(nodes) - 1
+        pending.extend((child, index, depth + 1) for child in reversed(node.get("children", [])))
+    return nodes
+
+
+def unused_tree(nodes):
+    """
+    Computes the unused space of every node of a flattened allocation tree (see read_tree) in one pass.
+
+    All nodes are sorted once by address; a sweep then keeps a stack of the open (enclosing) nodes, so each
+    node's unused space is the gaps between its children, collected as they go by. The stack also validates
+    the tree: a node's innermost enclosing node must be its parent, otherwise it overlaps a sibling.
+    Returns one IPSet per node (in the order of nodes). O(n log n).
+    """
+    # IPv4 and IPv6 nodes sort apart, by address width first
+    order = sorted(range(len(nodes)), key=lambda i: (nodes[i][0].MAX_MASK, nodes[i][0].first_num, nodes[i][0].mask, nodes[i][3]))
+    starts = [[] for _ in nodes]
+    ends = [[] for _ in nodes]
+    # next address not yet covered by a child, per open node
+    position = [cidr.first_num for cidr, _, _, _ in nodes]
+
+    def close(index):
+        cidr = nodes[index][0]
+        if position[index] <= cidr.last_num:
+            starts[index].append(position[index])
+            ends[index].append(cidr.last_num)
+        return
+
+    stack = []
+    for index in order:
+        cidr, _, parent, _ = nodes[index]
+        while stack and not nodes[stack[-1]][0].does_overlap(cidr):
+            close(stack.pop())
+        top = stack[-1] if stack else None
+        if top != parent:
+            # the parent encloses the node (read_tree checked), so something else opened in between
+            raise RuntimeError(f"Allocated subnets {nodes[top][0]} and {cidr} overlap.")
+        if parent is not None:
+            # the gap between the previous child (or the start of the parent) and this one
+            if position[parent] < cidr.first_num:
+                starts[parent].append(position[parent])
+                ends[parent].append(cidr.first_num - 1)
+            position[parent] = cidr.last_num + 1
+        stack.append(index)
+    while stack:
+        close(stack.pop())
+    return [IPSet._from_intervals(starts[i], ends[i], type(nodes[i][0])) for i in range(len(nodes))]
+
+
+def write_tree(nodes, free_sets, fmt="text", mask=None, out=None):
+    """
+    Writes the unused subnet CIDRs of every tree node (split/filtered to a mask, if given), parents first.
+
+    text indents nodes by depth, jsonl writes one object per node, csv one row per unused CIDR prefixed by the node name.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format {fmt}, must be one of {', '.join(FORMATS)}.")
+    out = sys.stdout if out is None else out
+    if fmt == "csv":
+        out.write(TREE_CSV_HEADER)
+    for (cidr, name, parent, depth), free in zip(nodes, free_sets):
+        cidrs = free.iter_cidrs()
+        if mask is not None:
+            cidrs = itertools.chain.from_iterable(free_cidr.divide(mask) for free_cidr in cidrs)
+        if fmt == "jsonl":
+            out.write(json.dumps({
+                "name": name,
+                "cidr": str(cidr),
+                "parent": None if parent is None else nodes[parent][1],
+                "depth": depth,
+                "free_hosts": free.size,
+                "unused": [str(free_cidr) for free_cidr in cidrs],
+            }) + "\n")
+        elif fmt == "csv":
+            # CIDRs never need quoting, so only the name goes through csv.writer, once per node
+            prefix = _csv_field(name)
+            out.write("".join(f"{prefix},{_format_line(free_cidr, fmt)}" for free_cidr in cidrs))
+        else:
+            indent = "  " * depth
+            out.write(f"{indent}{name} ({cidr}): {free.size} free hosts\n")
+            out.write("".join(f"{indent}  - {free_cidr}\n" for free_cidr in cidrs))
+    out.flush()
+    return
+
+
+def parse_args(argv=None):
+    """Parses command line args."""
+    parser = argparse.ArgumentParser()
+    networks = parser.add_mutually_exclusive_group(required=True)
+    networks.add_argument(
+        "-n",
+        "--network-cidr",
+        help="CIDR representing entire virtual network (IPv4, EX. 10.0.0.0/16, or IPv6, EX. 2001:db8::/48).",
+        dest="network",
+        type=str
+    )
+    networks.add_argument(
+        "--manifest",
+        help="Batch mode: filepath of a JSON Lines manifest of networks, one object per line with a network and " +
+             "either allocated (a list of CIDRs) or allocated_file, EX. " +
+             '{"name": "vpc-1", "network": "10.0.0.0/16", "allocated": ["10.0.0.0/24"]}. ' +
+             "Networks are computed in parallel and printed as each one finishes. Conflicts with (-n|--network-cidr)",
+        dest="manifest",
+        type=str
+    )
+    networks.add_argument(
+        "--tree",
+        help="Tree mode: filepath of a JSON allocation hierarchy, where every node has a cidr, an optional name, and " +
+             "optional children, EX. " +
+             '{"name": "vpc", "cidr": "10.0.0.0/16", "children": [{"name": "zone-a", "cidr": "10.0.0.0/18"}]}. ' +
+             "Prints the unused subnets of every node. Conflicts with (-n|--network-cidr)",
+        dest="tree",
+        type=str
+    )
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "-a",
+        "--allocated-subnet-list",
+        help="List of CIDRs that have already been allocated for subnets. Conflicts with (-f|--allocated-subnet-file)",
+        dest="allocated",
+        type=str,
+        nargs="*"
+    )
+    group.add_argument(
+        "-f",
+        "--allocated-subnet-file",
+        help="Relative filepath containing newline-separated CIDRs that have already been allocated for subnets " +
+             "(# comments allowed, gzip supported, - for stdin), or a binary snapshot (see --save-snapshot). Conflicts with (-a|--allocated-subnet-list)",
+        dest="allocated_file",
+        type=str
+    )
+    parser.add_argument(
+        "-m",
+        "--mask-filter",
+        help="Output filtering: will return all possible unused subnets with a specific mask (0-32, or 0-128 for IPv6).",
+        dest="mask",
+        type=int,
+        required=False
+    )
+    parser.add_argument(
+        "--format",
+        help="Output format of the subnet CIDRs: text (default), jsonl, or csv. " +
+             "For jsonl/csv, only the unused (or, with -m, the filtered) subnets go to stdout, everything else to stderr.",
+        dest="format",
+        choices=FORMATS,
+        default="text"
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--plan",
+        help="Instead of listing unused subnets, place a batch of new subnets in the unused space and list them. " +
+             "Requests are COUNTx/MASK, EX. --plan 40x/24 200x/28. Subnets are placed largest first, best-fit.",
+        dest="plan",
+        type=str,
+        nargs="+"
+    )
+    mode.add_argument(
+        "--capacity",
+        help="Instead of listing unused subnets, report how many subnets of each mask (0-32, or 0-128 for IPv6) still fit, " +
+             "the largest contiguous free range, and a fragmentation ratio.",
+        dest="capacity",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--save-snapshot",
+        help="Also write the validated allocated subnets to a binary snapshot file, which -f reads back " +
+             "without parsing any text.",
+        dest="save_snapshot",
+        type=str
+    )
+    parser.add_argument(
+        "--watch",
+        help="Keep following the allocated subnet file (-f) after printing the unused subnets, " +
+             "and print only the unused subnet CIDRs that are added (+) or removed (-) whenever it changes.",
+        dest="watch",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--interval",
+        help="--watch: seconds between checks of the allocated subnet file (default: 1).",
+        dest="interval",
+        type=float,
+        default=1.0
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="Batch mode: # of worker processes (default: # of CPUs).",
+        dest="workers",
+        type=int,
+        default=None
+    )
+    parser.add_argument(
+        "--parse-cache",
+        help="Parse CIDR strings through a bounded LRU cache of this many entries, so repeated strings " +
+             "(EX. shared ranges across --manifest networks) are only parsed once.",
+        dest="parse_cache",
+        type=int
+    )
+    parser.add_argument(
+        "--profile",
+        help="Print wall time, peak memory and IP/IPRange/CIDR object counts per phase to stderr.",
+        dest="profile",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--stats",
+        help="Like --profile, but as JSON.",
+        dest="stats",
+        action="store_true"
+    )
+    return parser.parse_args(argv)
+
+
+def _main_manifest(args, profiler):
+    """Runs the batch mode. Returns the exit code."""
+    if args.allocated is not None or args.allocated_file is not None or args.plan is not None or args.watch:
+        raise RuntimeError("--manifest provides the allocated subnets of each network, and conflicts with -a, -f, --plan and --watch.")
+    if args.workers is not None and args.workers < 1:
+        raise RuntimeError("--workers must be at least 1.")
+    if args.mask is not None:
+        # networks may be of either family: checked against each network again when it is computed
+        CIDRv6.validate_mask(args.mask)
+    with profiler.phase("read manifest"):
+        entries = read_manifest(args.manifest)
+    with profiler.phase("networks"):
+        failed = run_manifest(entries, args.workers, args.mask, args.capacity, args.format, cache_size=args.parse_cache)
+    if failed:
+        print(f"ERROR: {failed} of {len(entries)} networks failed.", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _main_tree(args, profiler):
+    """Runs the tree mode. Returns the exit code."""
+    if args.allocated is not None or args.allocated_file is not None or args.plan is not None or \
+            args.watch or args.capacity:
+        raise RuntimeError("--tree provides the allocated subnets of each node, and conflicts with -a, -f, --plan, " +
+                           "--watch and --capacity.")
     if args.mask is not None:
-        print(f"\nFiltering/splitting subnets to match mask filter ({args.mask})...", end=" ")
+        # nodes may be of either family: checked against each node again when it is divided
+        CIDRv6.validate_mask(args.mask)
+    with profiler.phase("read tree"):
+        with open(args.tree, "r") as tree_file:
+            try:
+                tree = json.load(tree_file)
+            except ValueError as e:
+                raise RuntimeError(f"{args.tree}: invalid JSON ({e}).")
+        nodes = read_tree(tree)
+    with profiler.phase("gap computation"):
+        free_sets = unused_tree(nodes)
+    with profiler.phase("output"):
+        write_tree(nodes, free_sets, args.format, args.mask)
+    return 0
+
+
+def main(argv=None):
+    """Runs the calculator. Returns the exit code."""
+    args = parse_args(argv)
+    # with machine-readable formats, stdout only carries the results
+    log = sys.stdout if args.format == "text" else sys.stderr
+
+    # instrumentation: a no-op unless requested
+    profiler = Profiler(enabled=args.profile or args.stats)
+
+    try:
+        if args.parse_cache is not None:
+            enable_parse_cache(args.parse_cache)
+        if args.manifest is not None:
+            return _main_manifest(args, profiler)
+        if args.tree is not None:
+            return _main_tree(args, profiler)
+
+        # initialize existing virtual network
+        print("Analyzing existing network...", end=" ", file=log)
+        with profiler.phase("parse network"):
+            network_cidr = _to_cidr(args.network)
+        print("Done.\n", file=log)
+        network_cidr.print_summary(file=log)
+
+        if args.watch:
+            if args.allocated_file is None or args.mask is not None or args.plan is not None or args.capacity:
+                raise RuntimeError("--watch follows an allocated subnet file (-f), and conflicts with -a, -m, --plan and --capacity.")
+            print(f"Watching {args.allocated_file} for changes (Ctrl+C to stop)...\n", file=log)
+            try:
+                watch(network_cidr, args.allocated_file, args.interval, args.format, log=sys.stderr)
+            except KeyboardInterrupt:
+                pass
+            return 0
+
+        # validate allocated subnets
+        print("Validating allocated subnets...", end=" ", file=log)
+        if args.allocated is not None:
+            allocated = args.allocated
+        else:
+            if args.allocated_file is None:
+                raise RuntimeError("No allocated subnets found. Must provide either a file (-f) containing " + 
+                                   "newline separated subnets, or a list (-a)" )
+            # snapshots are mapped; text files are streamed, collecting parse errors rather than stopping at the first one
+            allocated = open_allocated(args.allocated_file)
+        with profiler.phase("validate allocations"):
+            subnet_cidrs = parse_allocated(network_cidr, allocated)
+        with profiler.phase("overlap check"):
+            check_overlaps(subnet_cidrs)
+        if args.save_snapshot is not None:
+            with profiler.phase("save snapshot"):
+                CIDRSnapshot.write(args.save_snapshot, subnet_cidrs, cidr_class=type(network_cidr))
+        if args.mask is not None:
+            # validate mask
+            type(network_cidr).validate_mask(args.mask)
+        masks = parse_plan(args.plan, type(network_cidr)) if args.plan is not None else None
+        print("Done.", file=log)
+
+        if masks is not None:
+            # batch placement instead of listing the unused subnets
+            print(f"Placing {len(masks)} requested subnets...", end=" ", file=log)
+            with profiler.phase("planning"):
+                planned = SubnetAllocator(network_cidr, subnet_cidrs).allocate_many(masks)
+            print("Done.\n", file=log)
+            with profiler.phase("output"):
+                write_cidrs(planned, args.format)
+            return 0
+
+        print("Calculating unused subnet CIDRs...", end=" ", file=log)
+        with profiler.phase("gap computation"):
+            free = unused_space(network_cidr, subnet_cidrs)
+        if args.capacity:
+            # closed-form report instead of listing the unused subnets
+            print("Done.\n", file=log)
+            with profiler.phase("capacity"):
+                write_capacity(capacity_report(free), args.format)
+            return 0
+        with profiler.phase("from_ip_range"):
+            # convert each of the free ranges into a minimum number of CIDR blocks
+            cidrs = free.cidrs()
+        print("Done.\n", file=log)
+        if args.format == "text" or args.mask is None:
+            # print results
+            with profiler.phase("output"):
+                write_cidrs(cidrs, args.format)
 
-        # validate mask
-        CIDR.validate_mask(args.mask)
+        # if a specific mask is requested, breaks down the CIDRs from above to reach that
+        if args.mask is not None:
+            print(f"\nFiltering/splitting subnets to match mask filter ({args.mask})...", end=" ", file=log)
+            filtered_cidrs = itertools.chain.from_iterable(cidr.divide(args.mask) for cidr in cidrs)
+            print("Done.\n", file=log)
+            # print results. divide is lazy, so its cost lands in this phase
+            with profiler.phase("divide + output"):
+                write_cidrs(filtered_cidrs, args.format)
 
-        # filter out cidrs that have masks > args.mask, since those can't be broken down
-        # for cidrs that have masks < args.mask, split them further
-        # for cidrs that have masks = args.mask, simply append them
-        filtered_cidrs = list(itertools.chain.from_iterable(
-            [cidr.divide(args.mask) for cidr in unused_cidrs]
-        ))
+    except Exception as e:
+        print(f"ERROR: {str(e)}", file=log)
+        return 1
+    finally:
+        profiler.stop()
+        if args.profile:
+            print(f"\n{profiler.report()}", file=sys.stderr)
+            if parse_cache is not None:
+                print(f"Parse cache: {parse_cache.hits} hits, {parse_cache.misses} misses", file=sys.stderr)
+        if args.stats:
+            print(profiler.to_json(), file=sys.stderr)
+    return 0
 
-        print("Done.\n")
-        # print results
-        [print(f) for f in filtered_cidrs]
 
-except Exception as e:
-    print(f"ERROR: {str(e)}")
-    sys.exit(1)
+if __name__ == "__main__":
+    sys.exit(main())